@@ -0,0 +1,74 @@
+# Suporte ao SQLite como substituto local do SQL Server, para desenvolvimento,
+# perfis e benchmarks sem serviços de rede. O esquema vem das mesmas migrações
+# do Alembic usadas em produção e os dados de exemplo do sql/inserts.sql.
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import event, inspect
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+
+
+def em_memoria(url):
+    return url.database in (None, "", ":memory:")
+
+
+def opcoes_sqlite(url, opcoes_pool):
+    # check_same_thread: as conexões do pool são usadas pelas threads do
+    # threadpool, não só pela que as abriu
+    opcoes = {**opcoes_pool, "connect_args": {"check_same_thread": False}}
+    # O pool mantém uma única conexão, usada por uma sessão de cada vez: cada
+    # conexão a ":memory:" teria um banco próprio e vazio e, num arquivo, o
+    # SQLite serializa as escritas e recusa com "database is locked" as
+    # transações concorrentes que leem antes de escrever
+    assincrono = url.get_dialect().is_async
+    opcoes.update(
+        poolclass=AsyncAdaptedQueuePool if assincrono else QueuePool,
+        pool_size=1,
+        max_overflow=0,
+    )
+    if em_memoria(url):
+        # A única conexão guarda o banco inteiro: não pode ser reciclada
+        opcoes.update(pool_recycle=-1, pool_pre_ping=False)
+    return opcoes
+
+
+def configurar_sqlite(engine):
+    @event.listens_for(engine, "connect")
+    def configurar_conexao(conexao_dbapi, registro):
+        # O SQLite só aplica as chaves estrangeiras (e o ON DELETE CASCADE) com
+        # o PRAGMA ativo em cada conexão
+        cursor = conexao_dbapi.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+        # O driver abre as transações por conta própria e só antes de um DML,
+        # o que quebra os SAVEPOINTs das operações em lote; o BEGIN passa a ser
+        # emitido pelo SQLAlchemy
+        conexao_dbapi.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def iniciar_transacao(conexao):
+        conexao.exec_driver_sql("BEGIN")
+
+
+def comandos_sql(caminho):
+    with open(caminho, encoding="utf-8") as arquivo:
+        conteudo = arquivo.read()
+    for comando in conteudo.split(";\n"):
+        if comando.strip():
+            yield comando
+
+
+def preparar(conexao, dados_exemplo=True):
+    # Cria o esquema num banco vazio aplicando as migrações na própria conexão
+    # (necessário no banco em memória) e carrega os dados de exemplo
+    if inspect(conexao).has_table("alembic_version"):
+        return
+    configuracao = Config(os.path.join(PASTA, "alembic.ini"))
+    configuracao.attributes["connection"] = conexao
+    command.upgrade(configuracao, "head")
+    if dados_exemplo:
+        for comando in comandos_sql(os.path.join(PASTA, "sql", "inserts.sql")):
+            conexao.exec_driver_sql(comando)
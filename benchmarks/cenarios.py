@@ -0,0 +1,263 @@
+# Monta as requisições de cada rota da API a partir das rotas registradas no
+# app e dos modelos: ids dos parâmetros de caminho sorteados entre os
+# registros existentes, corpos de criação copiados de registros reais e
+# atualizações e exclusões aplicadas aos registros criados pelo próprio
+# benchmark.
+import datetime
+import random
+import re
+import uuid
+
+from fastapi.routing import APIRoute
+from sqlalchemy import func, insert, select
+
+import main
+
+# Valores dos parâmetros de query obrigatórios das rotas
+PARAMETROS_EXEMPLO = {"q": "maria silva"}
+
+PARAMETRO_CAMINHO = re.compile(r"\{(\w+)\}")
+
+
+def tabela_do_parametro(nome):
+    # estado_civil_id -> CP1_ESTADO_CIVIL
+    if nome.endswith("_id"):
+        return main.Base.metadata.tables.get(f"CP1_{nome[:-3].upper()}")
+
+
+class Cenario:
+    def __init__(self, metodo, rota, requisicoes, ao_responder=None):
+        self.metodo = metodo
+        self.rota = rota
+        # Função chamada só na hora da execução, depois dos cenários anteriores
+        self.requisicoes = requisicoes
+        self.ao_responder = ao_responder
+
+    @property
+    def nome(self):
+        return f"{self.metodo} {self.rota}"
+
+
+class Dados:
+    # Estado do banco usado para montar as requisições. Os métodos recebem uma
+    # conexão síncrona (no modo assíncrono são chamados via run_sync)
+    def __init__(self, semente):
+        self.aleatorio = random.Random(semente)
+        self.faixas = {}
+        self.modelos = {}
+        self.corpos = {}
+        self.bases = {}
+        self.criados = {}
+
+    def carregar(self, conexao, quantidade):
+        for recurso in main.RECURSOS:
+            prefixo, modelo, schema = recurso.prefixo, recurso.modelo, recurso.schema
+            self.modelos[prefixo] = (modelo, schema)
+            self.criados[prefixo] = []
+            minimo, maximo = conexao.execute(
+                select(func.min(modelo.id), func.max(modelo.id))
+            ).one()
+            self.faixas[modelo.__tablename__] = (minimo or 0, maximo or 0)
+            self.corpos[prefixo] = self.montar_corpos(
+                conexao, modelo, schema, quantidade
+            )
+
+    def montar_corpos(self, conexao, modelo, schema, quantidade):
+        registro = conexao.execute(select(modelo.__table__).limit(1)).first()
+        if registro is None:
+            return []
+        base = {
+            campo: valor.isoformat() if isinstance(valor, datetime.date) else valor
+            for campo, valor in registro._mapping.items()
+            if campo in schema.model_fields
+        }
+        self.bases[modelo.__tablename__] = base
+        corpos = [dict(base) for _ in range(quantidade)]
+        for coluna in modelo.__table__.columns:
+            if not coluna.unique or coluna.name not in base:
+                continue
+            if coluna.foreign_keys:
+                # Chave estrangeira única (ex.: um endereço por cliente): cada
+                # corpo aponta para um registro pai novo
+                valores = self.novos_pais(conexao, coluna, quantidade)
+            else:
+                valores = [
+                    uuid.uuid4().hex[: coluna.type.length] for _ in range(quantidade)
+                ]
+            for corpo, valor in zip(corpos, valores):
+                corpo[coluna.name] = valor
+        return corpos
+
+    def novos_pais(self, conexao, coluna, quantidade):
+        pai = next(iter(coluna.foreign_keys)).column.table
+        registro = conexao.execute(select(pai).limit(1)).first()
+        valores = {
+            nome: valor for nome, valor in registro._mapping.items() if nome != "id"
+        }
+        return conexao.scalars(
+            insert(pai).returning(pai.c.id, sort_by_parameter_order=True),
+            [valores] * quantidade,
+        ).all()
+
+    def id_existente(self, tabela):
+        minimo, maximo = self.faixas.get(tabela.name, (0, 0))
+        return self.aleatorio.randint(minimo, maximo) if maximo else 1
+
+    def caminho(self, rota):
+        return PARAMETRO_CAMINHO.sub(
+            lambda parametro: str(
+                self.id_existente(tabela_do_parametro(parametro.group(1)))
+            ),
+            rota,
+        )
+
+    def corpo(self, prefixo):
+        corpos = self.corpos[prefixo]
+        return corpos.pop() if corpos else None
+
+
+def rota_por_id(rotas, metodo, prefixo):
+    for rota in rotas:
+        if metodo in rota.methods and re.fullmatch(rf"/{prefixo}/\{{\w+\}}", rota.path):
+            return rota.path
+
+
+def leituras(dados, rotas, requisicoes, requisicoes_export):
+    cenarios = []
+    for rota in rotas:
+        if "GET" not in rota.methods:
+            continue
+        obrigatorios = [
+            parametro.alias
+            for parametro in rota.dependant.query_params
+            if parametro.field_info.is_required()
+        ]
+        if any(nome not in PARAMETROS_EXEMPLO for nome in obrigatorios):
+            continue
+        if any(
+            tabela_do_parametro(parametro.alias) is None
+            for parametro in rota.dependant.path_params
+        ):
+            continue
+        query = {nome: PARAMETROS_EXEMPLO[nome] for nome in obrigatorios}
+        quantidade = (
+            requisicoes_export if rota.path.endswith("/export") else requisicoes
+        )
+
+        def gerar(rota=rota, quantidade=quantidade, query=query):
+            return [
+                (dados.caminho(rota.path), query, None) for _ in range(quantidade)
+            ]
+
+        cenarios.append(Cenario("GET", rota.path, gerar))
+    return cenarios
+
+
+def gravacoes_do_cliente(dados, rotas, requisicoes):
+    # PUT /clientes/{cliente_id}/endereco e similares: criam ou atualizam o
+    # registro de clientes sorteados com os campos de um registro real
+    cenarios = []
+    for rota in rotas:
+        if "PUT" not in rota.methods:
+            continue
+        if not re.fullmatch(r"/\w+/\{\w+\}/\w+", rota.path):
+            continue
+        schema = rota.body_field.field_info.annotation
+        tabela = next(
+            modelo.__tablename__
+            for modelo, esquema in dados.modelos.values()
+            if issubclass(esquema, schema)
+        )
+        corpo = {
+            campo: valor
+            for campo, valor in dados.bases.get(tabela, {}).items()
+            if campo in schema.model_fields
+        }
+        if not corpo:
+            continue
+
+        def gerar(rota=rota, corpo=corpo):
+            return [(dados.caminho(rota.path), None, corpo) for _ in range(requisicoes)]
+
+        cenarios.append(Cenario("PUT", rota.path, gerar))
+    return cenarios
+
+
+def escritas(dados, rotas, prefixo, requisicoes, lote, requisicoes_lote):
+    criados = dados.criados[prefixo]
+    criados_lote = []
+
+    def registrar(criados):
+        def ao_responder(corpo_enviado, resposta):
+            if resposta.status_code == 200:
+                corpo = resposta.json()
+                if isinstance(corpo, dict) and "resultados" in corpo:
+                    for resultado, item in zip(corpo["resultados"], corpo_enviado):
+                        if "id" in resultado:
+                            criados.append((resultado["id"], item))
+                    return corpo["falhas"] == 0
+                criados.append((corpo["id"], corpo_enviado))
+            return resposta.status_code < 400
+
+        return ao_responder
+
+    def criar():
+        corpos = (dados.corpo(prefixo) for _ in range(requisicoes))
+        return [(f"/{prefixo}/", None, corpo) for corpo in corpos if corpo]
+
+    def atualizar():
+        return [(f"/{prefixo}/{id}", None, corpo) for id, corpo in criados]
+
+    def atualizar_parcial():
+        # Só o primeiro campo do corpo de criação
+        return [
+            (f"/{prefixo}/{id}", None, dict([next(iter(corpo.items()))]))
+            for id, corpo in criados
+        ]
+
+    def excluir():
+        return [(f"/{prefixo}/{id}", None, None) for id, _ in criados]
+
+    def criar_lote():
+        lotes = []
+        for _ in range(requisicoes_lote):
+            corpos = [dados.corpo(prefixo) for _ in range(lote)]
+            if all(corpos):
+                lotes.append((f"/{prefixo}/bulk", None, corpos))
+        return lotes
+
+    def atualizar_lote():
+        itens = [{**corpo, "id": id} for id, corpo in criados_lote]
+        return [
+            (f"/{prefixo}/bulk", None, itens[inicio : inicio + lote])
+            for inicio in range(0, len(itens), lote)
+        ]
+
+    def excluir_lote():
+        ids = [id for id, _ in criados_lote]
+        return [
+            (f"/{prefixo}/bulk", None, ids[inicio : inicio + lote])
+            for inicio in range(0, len(ids), lote)
+        ]
+
+    cenarios = [
+        Cenario("POST", f"/{prefixo}/", criar, registrar(criados)),
+        Cenario("PUT", rota_por_id(rotas, "PUT", prefixo), atualizar),
+        Cenario("PATCH", rota_por_id(rotas, "PATCH", prefixo), atualizar_parcial),
+        Cenario("DELETE", rota_por_id(rotas, "DELETE", prefixo), excluir),
+        Cenario("POST", f"/{prefixo}/bulk", criar_lote, registrar(criados_lote)),
+        Cenario("PUT", f"/{prefixo}/bulk", atualizar_lote),
+        Cenario("DELETE", f"/{prefixo}/bulk", excluir_lote),
+    ]
+    return [cenario for cenario in cenarios if cenario.rota is not None]
+
+
+def montar(dados, requisicoes, requisicoes_export, lote, requisicoes_lote):
+    rotas = [rota for rota in main.app.routes if isinstance(rota, APIRoute)]
+    cenarios = leituras(dados, rotas, requisicoes, requisicoes_export)
+    cenarios += gravacoes_do_cliente(dados, rotas, requisicoes)
+    for prefixo in dados.modelos:
+        cenarios += escritas(
+            dados, rotas, prefixo, requisicoes, lote, requisicoes_lote
+        )
+    return cenarios
@@ -0,0 +1,277 @@
+# Benchmark de carga das rotas da API.
+#
+#   python -m benchmarks.executar --clientes 100000 --concorrencia 20
+#
+# Por padrão a API roda no próprio processo (cliente ASGI do httpx, sem rede);
+# com --url as requisições vão para um servidor já em execução, que deve usar o
+# mesmo banco (DATABASE_URL) em que o benchmark insere os dados.
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import httpx
+
+import dados_sinteticos
+import main
+from benchmarks import cenarios
+
+
+def percentil(valores, fracao):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(fracao * len(ordenados)))]
+
+
+def rss_pico_mb(pid):
+    # VmHWM: pico de memória residente do processo (servidor externo); no
+    # modo interno, o próprio processo do benchmark
+    if pid is None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    with open(f"/proc/{pid}/status") as arquivo:
+        for linha in arquivo:
+            if linha.startswith("VmHWM:"):
+                return int(linha.split()[1]) / 1024
+
+
+async def com_conexao(funcao, *argumentos):
+    # Executa no banco usado pelas rotas, inclusive o banco em memória
+    if main.DB_ASYNC:
+        async with main.banco.engine_async.begin() as conexao:
+            return await conexao.run_sync(funcao, *argumentos)
+
+    def executar():
+        with main.banco.engine.begin() as conexao:
+            return funcao(conexao, *argumentos)
+
+    return await asyncio.to_thread(executar)
+
+
+async def medir(cliente, cenario, concorrencia):
+    requisicoes = iter(cenario.requisicoes())
+    duracoes = []
+    erros = 0
+
+    async def trabalhador():
+        nonlocal erros
+        for caminho, query, corpo in requisicoes:
+            inicio = time.perf_counter()
+            resposta = await cliente.request(
+                cenario.metodo, caminho, params=query, json=corpo
+            )
+            await resposta.aread()
+            duracoes.append(time.perf_counter() - inicio)
+            if cenario.ao_responder is not None:
+                sucesso = cenario.ao_responder(corpo, resposta)
+            else:
+                sucesso = resposta.status_code < 400
+            erros += not sucesso
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    total = time.perf_counter() - inicio
+    return {
+        "requisicoes": len(duracoes),
+        "erros": erros,
+        "p50_ms": round(percentil(duracoes, 0.50) * 1000, 3),
+        "p95_ms": round(percentil(duracoes, 0.95) * 1000, 3),
+        "p99_ms": round(percentil(duracoes, 0.99) * 1000, 3),
+        "rps": round(len(duracoes) / total, 1) if total else 0.0,
+    }
+
+
+async def executar_cenarios(cliente, argumentos):
+    if not argumentos.sem_carga:
+        inicio = time.perf_counter()
+        await com_conexao(
+            dados_sinteticos.carregar,
+            argumentos.clientes,
+            argumentos.historicos,
+            argumentos.semente,
+        )
+        print(f"Carga concluída em {time.perf_counter() - inicio:.1f}s")
+
+    dados = cenarios.Dados(argumentos.semente)
+    await com_conexao(
+        dados.carregar,
+        argumentos.requisicoes + argumentos.lote * argumentos.requisicoes_lote,
+    )
+    lista = cenarios.montar(
+        dados,
+        argumentos.requisicoes,
+        argumentos.requisicoes_export,
+        argumentos.lote,
+        argumentos.requisicoes_lote,
+    )
+
+    resultados = {}
+    for cenario in lista:
+        if argumentos.rotas and argumentos.rotas not in cenario.nome:
+            continue
+        resultado = await medir(cliente, cenario, argumentos.concorrencia)
+        if resultado["requisicoes"]:
+            resultados[cenario.nome] = resultado
+            print(
+                f"{cenario.nome:<60} p50 {resultado['p50_ms']:>9.2f} ms  "
+                f"p95 {resultado['p95_ms']:>9.2f} ms  "
+                f"p99 {resultado['p99_ms']:>9.2f} ms  "
+                f"{resultado['rps']:>8.1f} req/s  {resultado['erros']} erros"
+            )
+    return resultados
+
+
+async def executar(argumentos):
+    if argumentos.url:
+        await main.banco.preparar()
+        async with httpx.AsyncClient(
+            base_url=argumentos.url, timeout=None
+        ) as cliente:
+            return await executar_cenarios(cliente, argumentos)
+
+    transporte = httpx.ASGITransport(app=main.app)
+    async with main.ciclo_de_vida(main.app):
+        async with httpx.AsyncClient(
+            transport=transporte, base_url="http://benchmark", timeout=None
+        ) as cliente:
+            return await executar_cenarios(cliente, argumentos)
+
+
+def comparar(resultados, baseline, tolerancia):
+    # Regressão: p95 acima ou vazão abaixo da baseline além da tolerância. O
+    # piso de 1 ms no p95 evita acusar variações de rotas muito rápidas
+    regressoes = []
+    for nome, atual in resultados["rotas"].items():
+        anterior = baseline["rotas"].get(nome)
+        if anterior is None:
+            continue
+        limite_p95 = max(
+            anterior["p95_ms"] * (1 + tolerancia), anterior["p95_ms"] + 1
+        )
+        if atual["p95_ms"] > limite_p95:
+            regressoes.append(
+                f"{nome}: p95 {anterior['p95_ms']:.2f} -> {atual['p95_ms']:.2f} ms"
+            )
+        if atual["rps"] < anterior["rps"] * (1 - tolerancia):
+            regressoes.append(
+                f"{nome}: vazão {anterior['rps']:.1f} -> {atual['rps']:.1f} req/s"
+            )
+    return regressoes
+
+
+def argumentos_da_linha_de_comando():
+    parser = argparse.ArgumentParser(
+        description="Benchmark de carga das rotas da API"
+    )
+    parser.add_argument("--clientes", type=int, default=10000)
+    parser.add_argument(
+        "--historicos",
+        type=int,
+        default=None,
+        help="Clientes com históricos de saúde e hospitalar (padrão: metade)",
+    )
+    parser.add_argument(
+        "--sem-carga",
+        action="store_true",
+        help="Não insere dados; usa o que já está no banco",
+    )
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--concorrencia", type=int, default=10)
+    parser.add_argument(
+        "--requisicoes", type=int, default=200, help="Requisições por rota"
+    )
+    parser.add_argument("--requisicoes-export", type=int, default=3)
+    parser.add_argument(
+        "--lote", type=int, default=100, help="Itens por requisição nas rotas /bulk"
+    )
+    parser.add_argument("--requisicoes-lote", type=int, default=5)
+    parser.add_argument(
+        "--rotas", help="Executa só as rotas cujo nome contém este texto"
+    )
+    parser.add_argument(
+        "--url", help="Servidor externo (ex.: http://localhost:8000)"
+    )
+    parser.add_argument(
+        "--pid", type=int, help="PID do servidor externo, para o RSS"
+    )
+    parser.add_argument(
+        "--saida",
+        default=os.path.join(
+            "benchmarks",
+            "resultados",
+            f"{datetime.datetime.now():%Y%m%d-%H%M%S}.json",
+        ),
+    )
+    parser.add_argument(
+        "--baseline", default=os.path.join("benchmarks", "baseline.json")
+    )
+    parser.add_argument(
+        "--salvar-baseline",
+        action="store_true",
+        help="Grava o resultado como nova baseline",
+    )
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    argumentos = parser.parse_args()
+    if argumentos.historicos is None:
+        argumentos.historicos = argumentos.clientes // 2
+    return argumentos
+
+
+def principal():
+    argumentos = argumentos_da_linha_de_comando()
+    inicio = time.perf_counter()
+    rotas = asyncio.run(executar(argumentos))
+    resultados = {
+        "data": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "banco": main.url_banco().get_backend_name(),
+        "assincrono": main.DB_ASYNC,
+        "modo": "externo" if argumentos.url else "interno",
+        "parametros": {
+            "clientes": argumentos.clientes,
+            "historicos": argumentos.historicos,
+            "concorrencia": argumentos.concorrencia,
+            "requisicoes": argumentos.requisicoes,
+        },
+        "duracao_s": round(time.perf_counter() - inicio, 1),
+        "rss_pico_mb": round(rss_pico_mb(argumentos.pid), 1),
+        "rotas": rotas,
+    }
+
+    os.makedirs(os.path.dirname(argumentos.saida) or ".", exist_ok=True)
+    with open(argumentos.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+    print(f"RSS de pico: {resultados['rss_pico_mb']} MB")
+    print(f"Resultados gravados em {argumentos.saida}")
+
+    if argumentos.salvar_baseline:
+        with open(argumentos.baseline, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+        print(f"Baseline gravada em {argumentos.baseline}")
+    elif os.path.exists(argumentos.baseline):
+        with open(argumentos.baseline, encoding="utf-8") as arquivo:
+            baseline = json.load(arquivo)
+        # Números de bancos ou modos diferentes não são comparáveis
+        diferencas = [
+            chave
+            for chave in ("banco", "assincrono", "modo", "parametros")
+            if baseline.get(chave) != resultados[chave]
+        ]
+        if diferencas:
+            print(f"Baseline ignorada: {', '.join(diferencas)} diferente(s)")
+            return
+        regressoes = comparar(resultados, baseline, argumentos.tolerancia)
+        for regressao in regressoes:
+            print(f"REGRESSÃO {regressao}")
+        if regressoes:
+            sys.exit(1)
+        print("Sem regressões em relação à baseline")
+
+
+if __name__ == "__main__":
+    principal()
@@ -0,0 +1,85 @@
+# Backends de cache usados pelas rotas de leitura das tabelas de referência.
+# Além dos valores, o cache guarda um contador de versão por tabela: as chaves
+# incluem as versões das tabelas consultadas e cada escrita incrementa a versão,
+# de modo que as entradas antigas deixam de ser usadas sem precisar apagá-las.
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheMemoria:
+    # LRU limitado pela quantidade de chaves, com expiração por TTL. As versões
+    # são locais ao processo: escritas feitas por outros workers não as alteram
+    compartilhado = False
+
+    def __init__(self, maximo, ttl):
+        self.maximo = maximo
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.itens = OrderedDict()
+        # As versões começam num valor aleatório para não se repetirem entre
+        # reinícios do processo
+        self.base = random.getrandbits(32)
+        self.contadores = {}
+
+    def get(self, chave):
+        with self.lock:
+            item = self.itens.get(chave)
+            if item is None:
+                return None
+            valor, expira_em = item
+            if expira_em < time.monotonic():
+                del self.itens[chave]
+                return None
+            self.itens.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor):
+        with self.lock:
+            self.itens[chave] = (valor, time.monotonic() + self.ttl)
+            self.itens.move_to_end(chave)
+            while len(self.itens) > self.maximo:
+                self.itens.popitem(last=False)
+
+    def versoes(self, tabelas):
+        with self.lock:
+            return [self.base + self.contadores.get(tabela, 0) for tabela in tabelas]
+
+    def incrementar_versao(self, tabela):
+        with self.lock:
+            self.contadores[tabela] = self.contadores.get(tabela, 0) + 1
+
+
+class CacheRedis:
+    # Compartilhado entre workers e instâncias; exige o pacote "redis"
+    compartilhado = True
+
+    def __init__(self, url, ttl):
+        import redis
+
+        self.cliente = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, chave):
+        valor = self.cliente.get(chave)
+        return None if valor is None else json.loads(valor)
+
+    def set(self, chave, valor):
+        self.cliente.set(chave, json.dumps(valor, default=str), ex=self.ttl)
+
+    def versoes(self, tabelas):
+        chaves = [f"versao:{tabela}" for tabela in tabelas]
+        return [int(versao or 0) for versao in self.cliente.mget(chaves)]
+
+    def incrementar_versao(self, tabela):
+        self.cliente.incr(f"versao:{tabela}")
+
+
+def criar_cache(backend, maximo, ttl, url=None):
+    if backend == "memoria":
+        return CacheMemoria(maximo, ttl)
+    if backend == "redis":
+        return CacheRedis(url, ttl)
+    raise ValueError(f"Backend de cache desconhecido: {backend}")
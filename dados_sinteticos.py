@@ -0,0 +1,521 @@
+# Gera dados sintéticos consistentes para todas as tabelas CP1_*, em volume de
+# produção, a partir do número de clientes:
+#
+#   python dados_sinteticos.py --clientes 1000000                # no banco
+#   python dados_sinteticos.py --clientes 1000000 --formato sql --saida dados.sql
+#   python dados_sinteticos.py --clientes 1000000 --formato csv --saida dados/
+#
+# Os ids são gerados explicitamente, a partir do maior id de cada tabela no
+# banco (ou de 1, nos arquivos), e as chaves estrangeiras só apontam para
+# registros gerados na mesma execução. As linhas são produzidas sob demanda e
+# gravadas em lotes, sem manter as tabelas em memória.
+import argparse
+import csv
+import datetime
+import os
+import random
+import sys
+
+from sqlalchemy import func, insert, select
+
+import main
+
+# Estados e o peso aproximado de cada um na população
+ESTADOS = [
+    ("Acre", 1),
+    ("Alagoas", 3),
+    ("Amapá", 1),
+    ("Amazonas", 4),
+    ("Bahia", 14),
+    ("Ceará", 9),
+    ("Distrito Federal", 3),
+    ("Espírito Santo", 4),
+    ("Goiás", 7),
+    ("Maranhão", 7),
+    ("Mato Grosso", 4),
+    ("Mato Grosso do Sul", 3),
+    ("Minas Gerais", 20),
+    ("Pará", 8),
+    ("Paraíba", 4),
+    ("Paraná", 11),
+    ("Pernambuco", 9),
+    ("Piauí", 3),
+    ("Rio de Janeiro", 16),
+    ("Rio Grande do Norte", 3),
+    ("Rio Grande do Sul", 11),
+    ("Rondônia", 2),
+    ("Roraima", 1),
+    ("Santa Catarina", 7),
+    ("São Paulo", 44),
+    ("Sergipe", 2),
+    ("Tocantins", 2),
+]
+AREAS_ATUACAO = [
+    "Clínica Geral",
+    "Cardiologia",
+    "Pediatria",
+    "Ortopedia",
+    "Ginecologia",
+    "Dermatologia",
+    "Oncologia",
+    "Neurologia",
+    "Oftalmologia",
+    "Psiquiatria",
+    "Diagnóstico por Imagem",
+    "Pronto Atendimento",
+]
+ESTADOS_CIVIS = [
+    "Solteiro(a)",
+    "Casado(a)",
+    "Divorciado(a)",
+    "Viúvo(a)",
+    "União Estável",
+]
+COMORBIDADES = [
+    "Hipertensão",
+    "Diabetes tipo 1",
+    "Diabetes tipo 2",
+    "Asma",
+    "Obesidade",
+    "Doença renal crônica",
+    "DPOC",
+    "Insuficiência cardíaca",
+    "Hipotireoidismo",
+    "Depressão",
+    "Ansiedade",
+    "Artrite reumatoide",
+    "Nenhuma",
+]
+PRIMEIROS_NOMES = (
+    "Ana Maria Juliana Fernanda Patrícia Camila Beatriz Larissa Aline Gabriela"
+    " João José Carlos Paulo Lucas Pedro Rafael Gustavo Marcos Felipe Bruno"
+    " Eduardo Luiza Mariana Rodrigo"
+).split()
+SOBRENOMES = (
+    "Silva Santos Oliveira Souza Rodrigues Ferreira Alves Pereira Lima Gomes"
+    " Costa Ribeiro Martins Carvalho Almeida Lopes Soares Fernandes Vieira Barbosa"
+).split()
+LOGRADOUROS = [
+    "Rua das Flores",
+    "Avenida Brasil",
+    "Rua São João",
+    "Rua XV de Novembro",
+    "Avenida Paulista",
+    "Rua Sete de Setembro",
+    "Rua Santos Dumont",
+    "Avenida Getúlio Vargas",
+    "Rua Tiradentes",
+    "Rua Dom Pedro II",
+]
+TIPOS_EMPRESA = ["Saúde", "Seguradora", "Operadora", "Cooperativa médica"]
+TIPOS_UNIDADE = ["Hospital", "Clínica", "Laboratório", "Pronto-socorro"]
+TIPOS_SERVICO = ["Consulta Médica", "Internação", "Exames", "Odontológico"]
+COBERTURAS = [
+    "Consultas e exames básicos",
+    "Ambulatorial",
+    "Ambulatorial e hospitalar",
+    "Nacional completa",
+]
+HORARIOS = [
+    "Segunda a Sexta, 08:00 - 17:00",
+    "Segunda a Sexta, 13:00 - 22:00",
+    "Sábado e Domingo, 08:00 - 20:00",
+    "Plantão 24h",
+]
+HISTORICOS = [
+    "Consulta de rotina",
+    "Cirurgia de apendicite",
+    "Internação por pneumonia",
+    "Fratura de braço",
+    "Parto normal",
+    "Nenhum histórico relevante",
+]
+EXAMES = ["Hemograma", "Raio-X", "Eletrocardiograma", "Ultrassom", "Ressonância"]
+MEDICAMENTOS = ["Paracetamol", "Dipirona", "Amoxicilina", "Losartana", "Nenhum"]
+OBSERVACOES = ["Sem observações", "Retorno em 6 meses", "Acompanhamento anual"]
+
+HOJE = datetime.date(2026, 1, 1)
+
+
+def digito_verificador(digitos, pesos):
+    resto = sum(digito * peso for digito, peso in zip(digitos, pesos)) % 11
+    return 0 if resto < 2 else 11 - resto
+
+
+def cpf(numero):
+    digitos = [int(digito) for digito in f"{numero % 10**9:09d}"]
+    digitos.append(digito_verificador(digitos, range(10, 1, -1)))
+    digitos.append(digito_verificador(digitos, range(11, 1, -1)))
+    texto = "".join(map(str, digitos))
+    return f"{texto[:3]}.{texto[3:6]}.{texto[6:9]}-{texto[9:]}"
+
+
+def cnpj(numero):
+    # Matriz (0001) com a raiz derivada do id: único por empresa
+    digitos = [int(digito) for digito in f"{numero % 10**8:08d}0001"]
+    pesos = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+    digitos.append(digito_verificador(digitos, pesos))
+    digitos.append(digito_verificador(digitos, [6] + pesos))
+    return "".join(map(str, digitos))
+
+
+def volumes(clientes, historicos=None):
+    # Proporções aproximadas de uma operadora de saúde em produção
+    historicos = clientes // 2 if historicos is None else min(historicos, clientes)
+    unidades = max(5, clientes // 1000)
+    medicos = max(10, clientes // 100)
+    return {
+        main.Estado: len(ESTADOS),
+        main.Cidade: max(len(ESTADOS), clientes // 200),
+        main.Empresa: max(3, clientes // 5000),
+        main.Convenio: 3 * max(3, clientes // 5000),
+        main.AreaAtuacao: len(AREAS_ATUACAO),
+        main.Unidade: unidades,
+        main.EnderecoUnidade: unidades,
+        main.Medico: medicos,
+        main.MedicoUnidade: 2 * medicos,
+        main.EstadoCivil: len(ESTADOS_CIVIS),
+        main.Cliente: clientes,
+        main.EnderecoCliente: clientes,
+        main.Comorbidade: len(COMORBIDADES),
+        main.HistoricoSaudeCliente: historicos,
+        main.HistoricoHospitalCliente: historicos,
+    }
+
+
+def ultimos_ids(conexao):
+    return {
+        recurso.modelo: conexao.scalar(
+            select(func.coalesce(func.max(recurso.modelo.id), 0))
+        )
+        for recurso in main.RECURSOS
+    }
+
+
+class Gerador:
+    def __init__(self, clientes, historicos=None, semente=42, ultimos=None):
+        self.aleatorio = random.Random(semente)
+        self.quantidades = volumes(clientes, historicos)
+        self.ultimos = ultimos or {}
+
+    def ids(self, modelo):
+        inicio = self.ultimos.get(modelo, 0) + 1
+        return range(inicio, inicio + self.quantidades[modelo])
+
+    def sortear(self, modelo):
+        return self.aleatorio.choice(self.ids(modelo))
+
+    def nome(self):
+        return (
+            f"{self.aleatorio.choice(PRIMEIROS_NOMES)} "
+            f"{self.aleatorio.choice(SOBRENOMES)} {self.aleatorio.choice(SOBRENOMES)}"
+        )
+
+    def telefone(self):
+        ddd = self.aleatorio.randint(11, 99)
+        return f"{ddd}9{self.aleatorio.randrange(10**8):08d}"
+
+    def data(self, dias_atras):
+        return HOJE - datetime.timedelta(days=self.aleatorio.randrange(dias_atras))
+
+    def endereco(self):
+        return {
+            "rua": self.aleatorio.choice(LOGRADOUROS),
+            "numero": str(self.aleatorio.randint(1, 9999)),
+            "cep": f"{self.aleatorio.randrange(10**5):05d}-"
+            f"{self.aleatorio.randrange(1000):03d}",
+            "cidade_id": self.sortear(main.Cidade),
+        }
+
+    def estados(self):
+        for id, (nome, _) in zip(self.ids(main.Estado), ESTADOS):
+            yield {"id": id, "nome": nome}
+
+    def cidades(self):
+        # Mais cidades nos estados mais populosos
+        estados = self.aleatorio.choices(
+            self.ids(main.Estado),
+            [peso for _, peso in ESTADOS],
+            k=self.quantidades[main.Cidade],
+        )
+        for id, estado_id in zip(self.ids(main.Cidade), estados):
+            yield {"id": id, "nome": f"Cidade {id}", "estado_id": estado_id}
+
+    def empresas(self):
+        for id in self.ids(main.Empresa):
+            yield {
+                "id": id,
+                "cnpj": cnpj(id),
+                "nome": f"{self.aleatorio.choice(SOBRENOMES)} Saúde {id}",
+                "tipo": self.aleatorio.choice(TIPOS_EMPRESA),
+                "telefone": self.telefone(),
+                "email": f"contato{id}@empresa.com.br",
+            }
+
+    def convenios(self):
+        for id in self.ids(main.Convenio):
+            yield {
+                "id": id,
+                "empresa_id": self.sortear(main.Empresa),
+                "nome": f"Plano {id}",
+                "valor": round(self.aleatorio.uniform(80, 2500), 2),
+                "tipo_servico": self.aleatorio.choice(TIPOS_SERVICO),
+                "cobertura": self.aleatorio.choice(COBERTURAS),
+                "contato": f"atendimento{id}@convenio.com.br",
+                "validade": HOJE + datetime.timedelta(self.aleatorio.randrange(1460)),
+            }
+
+    def areas_atuacao(self):
+        for id, nome in zip(self.ids(main.AreaAtuacao), AREAS_ATUACAO):
+            yield {"id": id, "nome": nome}
+
+    def unidades(self):
+        for id in self.ids(main.Unidade):
+            yield {
+                "id": id,
+                "empresa_id": self.sortear(main.Empresa),
+                "area_atuacao_id": self.sortear(main.AreaAtuacao),
+                "nome": f"Unidade {id}",
+                "telefone": self.telefone(),
+                "email": f"unidade{id}@email.com",
+                "tipo": self.aleatorio.choice(TIPOS_UNIDADE),
+                "capacidade": self.aleatorio.randint(20, 800),
+            }
+
+    def enderecos_unidade(self):
+        for id, unidade_id in zip(
+            self.ids(main.EnderecoUnidade), self.ids(main.Unidade)
+        ):
+            yield {"id": id, "unidade_id": unidade_id, **self.endereco()}
+
+    def medicos(self):
+        for id in self.ids(main.Medico):
+            nome = self.nome()
+            yield {
+                "id": id,
+                "nome": f"Dr(a). {nome}",
+                "telefone": self.telefone(),
+                "email": f"medico{id}@email.com",
+                "especialidade": self.aleatorio.choice(AREAS_ATUACAO),
+                "crm": f"{id:06d}-{self.aleatorio.choice(('SP', 'RJ', 'MG', 'PR'))}",
+            }
+
+    def medicos_unidade(self):
+        # Cada médico atende em duas unidades distintas (quando existem)
+        ids = iter(self.ids(main.MedicoUnidade))
+        unidades = self.ids(main.Unidade)
+        for medico_id in self.ids(main.Medico):
+            for unidade_id in self.aleatorio.sample(unidades, 2):
+                yield {
+                    "id": next(ids),
+                    "medico_id": medico_id,
+                    "unidade_id": unidade_id,
+                    "horario_atendimento": self.aleatorio.choice(HORARIOS),
+                }
+
+    def estados_civis(self):
+        for id, nome in zip(self.ids(main.EstadoCivil), ESTADOS_CIVIS):
+            yield {"id": id, "nome": nome}
+
+    def clientes(self):
+        for id in self.ids(main.Cliente):
+            yield {
+                "id": id,
+                "rg": f"{self.aleatorio.randrange(10**9):09d}",
+                "nome": self.nome(),
+                "sexo": self.aleatorio.choices("MFO", (49, 49, 2))[0],
+                "telefone": self.telefone(),
+                "email": f"cliente{id}@email.com",
+                "data_nascimento": self.data(95 * 365),
+                "cpf": cpf(id),
+                "convenio_id": self.sortear(main.Convenio),
+                "estado_civil_id": self.sortear(main.EstadoCivil),
+            }
+
+    def enderecos_cliente(self):
+        for id, cliente_id in zip(
+            self.ids(main.EnderecoCliente), self.ids(main.Cliente)
+        ):
+            yield {"id": id, "cliente_id": cliente_id, **self.endereco()}
+
+    def comorbidades(self):
+        for id, nome in zip(self.ids(main.Comorbidade), COMORBIDADES):
+            yield {"id": id, "nome": nome}
+
+    def historicos_saude(self):
+        # Os históricos são únicos por cliente: ficam com os primeiros clientes
+        for id, cliente_id in zip(
+            self.ids(main.HistoricoSaudeCliente), self.ids(main.Cliente)
+        ):
+            yield {
+                "id": id,
+                "cliente_id": cliente_id,
+                "comorbidade_id": self.sortear(main.Comorbidade),
+                "data_registro": self.data(5 * 365),
+                "fuma": int(self.aleatorio.random() < 0.15),
+                "observacoes": self.aleatorio.choice(OBSERVACOES),
+            }
+
+    def historicos_hospital(self):
+        for id, cliente_id in zip(
+            self.ids(main.HistoricoHospitalCliente), self.ids(main.Cliente)
+        ):
+            yield {
+                "id": id,
+                "cliente_id": cliente_id,
+                "data_registro": self.data(5 * 365),
+                "historico_medico": self.aleatorio.choice(HISTORICOS),
+                "exames_realizados": self.aleatorio.choice(EXAMES),
+                "medicamentos_prescritos": self.aleatorio.choice(MEDICAMENTOS),
+                "observacoes": self.aleatorio.choice(OBSERVACOES),
+            }
+
+    def tabelas(self):
+        # Na ordem das chaves estrangeiras: cada tabela só referencia as
+        # anteriores
+        return [
+            (main.Estado, self.estados()),
+            (main.Cidade, self.cidades()),
+            (main.Empresa, self.empresas()),
+            (main.Convenio, self.convenios()),
+            (main.AreaAtuacao, self.areas_atuacao()),
+            (main.Unidade, self.unidades()),
+            (main.EnderecoUnidade, self.enderecos_unidade()),
+            (main.Medico, self.medicos()),
+            (main.MedicoUnidade, self.medicos_unidade()),
+            (main.EstadoCivil, self.estados_civis()),
+            (main.Cliente, self.clientes()),
+            (main.EnderecoCliente, self.enderecos_cliente()),
+            (main.Comorbidade, self.comorbidades()),
+            (main.HistoricoSaudeCliente, self.historicos_saude()),
+            (main.HistoricoHospitalCliente, self.historicos_hospital()),
+        ]
+
+
+def lotes(linhas, tamanho):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) == tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def carregar(conexao, clientes, historicos=None, semente=42, lote=5000):
+    # executemany do driver em lotes: com o pyodbc, o fast_executemany do
+    # engine envia cada lote de uma vez, e o dialeto do SQL Server liga o
+    # IDENTITY_INSERT por conta dos ids explícitos
+    gerador = Gerador(clientes, historicos, semente, ultimos_ids(conexao))
+    for modelo, linhas in gerador.tabelas():
+        for linhas_lote in lotes(linhas, lote):
+            conexao.execute(insert(modelo), linhas_lote)
+    return gerador
+
+
+def literal(valor):
+    if valor is None:
+        return "NULL"
+    if isinstance(valor, str):
+        return "'" + valor.replace("'", "''") + "'"
+    if isinstance(valor, datetime.date):
+        return f"'{valor.isoformat()}'"
+    return repr(valor)
+
+
+def escrever_sql(arquivo, gerador, dialeto, lote=1000):
+    # INSERTs de várias linhas (o SQL Server aceita até 1000 por comando),
+    # terminados em ";\n" como o sql/inserts.sql
+    for modelo, linhas in gerador.tabelas():
+        tabela = modelo.__tablename__
+        nomes = [coluna.name for coluna in modelo.__table__.columns]
+        colunas = ", ".join(nomes)
+        if dialeto == "mssql":
+            arquivo.write(f"SET IDENTITY_INSERT {tabela} ON;\n")
+        for linhas_lote in lotes(linhas, lote):
+            valores = ",\n    ".join(
+                f"({', '.join(literal(linha[nome]) for nome in nomes)})"
+                for linha in linhas_lote
+            )
+            arquivo.write(
+                f"INSERT INTO {tabela} ({colunas}) VALUES\n    {valores};\n"
+            )
+        if dialeto == "mssql":
+            arquivo.write(f"SET IDENTITY_INSERT {tabela} OFF;\n")
+
+
+def escrever_csv(pasta, gerador):
+    # Um arquivo por tabela, com cabeçalho, para BULK INSERT ... WITH
+    # (FORMAT = 'CSV', FIRSTROW = 2, KEEPIDENTITY) ou ".import --csv" do sqlite3,
+    # com as colunas na ordem da tabela
+    os.makedirs(pasta, exist_ok=True)
+    for modelo, linhas in gerador.tabelas():
+        caminho = os.path.join(pasta, f"{modelo.__tablename__}.csv")
+        nomes = [coluna.name for coluna in modelo.__table__.columns]
+        with open(caminho, "w", newline="", encoding="utf-8") as arquivo:
+            escritor = csv.DictWriter(arquivo, fieldnames=nomes)
+            escritor.writeheader()
+            escritor.writerows(linhas)
+
+
+def argumentos_da_linha_de_comando():
+    parser = argparse.ArgumentParser(
+        description="Gera dados sintéticos para as tabelas CP1_*"
+    )
+    parser.add_argument("--clientes", type=int, default=100000)
+    parser.add_argument(
+        "--historicos",
+        type=int,
+        default=None,
+        help="Clientes com históricos de saúde e hospitalar (padrão: metade)",
+    )
+    parser.add_argument(
+        "--formato", choices=("banco", "sql", "csv"), default="banco"
+    )
+    parser.add_argument(
+        "--saida", help="Arquivo .sql ou pasta dos .csv (padrão: saída padrão)"
+    )
+    parser.add_argument(
+        "--dialeto",
+        choices=("mssql", "sqlite"),
+        help="Dialeto do SQL gerado (padrão: o do banco configurado)",
+    )
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--lote", type=int, default=5000)
+    return parser.parse_args()
+
+
+def principal():
+    argumentos = argumentos_da_linha_de_comando()
+    if argumentos.formato == "banco":
+        if main.banco.engine.dialect.name == "sqlite":
+            main.banco.preparar_sqlite()
+        with main.banco.engine.begin() as conexao:
+            gerador = carregar(
+                conexao,
+                argumentos.clientes,
+                argumentos.historicos,
+                argumentos.semente,
+                argumentos.lote,
+            )
+    else:
+        gerador = Gerador(
+            argumentos.clientes, argumentos.historicos, argumentos.semente
+        )
+        if argumentos.formato == "csv":
+            escrever_csv(argumentos.saida or "dados", gerador)
+        else:
+            dialeto = argumentos.dialeto or main.url_banco().get_backend_name()
+            if argumentos.saida:
+                with open(argumentos.saida, "w", encoding="utf-8") as arquivo:
+                    escrever_sql(arquivo, gerador, dialeto)
+            else:
+                escrever_sql(sys.stdout, gerador, dialeto)
+
+    for modelo, quantidade in gerador.quantidades.items():
+        print(f"{modelo.__tablename__:<32} {quantidade:>10}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    principal()
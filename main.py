@@ -1,33 +1,394 @@
-from fastapi import FastAPI, Depends
+import asyncio
+import concurrent.futures
+import contextlib
+import functools
+import hashlib
+import inspect
+import itertools
+import json
+import logging
+import operator
+import queue
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timezone
+from typing import Annotated, Any, Dict, Generic, List, Literal, Optional, TypeVar
+
+from fastapi import FastAPI, Body, Depends, HTTPException, Path, Query, Request
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
 from sqlalchemy import (
     create_engine,
+    event,
+    select,
+    insert,
+    update,
+    delete,
+    inspect as sa_inspect,
+    and_,
+    bindparam,
+    column,
+    exists,
+    false,
+    func,
+    literal,
+    literal_column,
+    or_,
     Column,
     Integer,
     String,
     Float,
+    table,
+    text,
     Date,
+    DateTime,
     ForeignKey,
+    Index,
     CHAR,
+    UnicodeText,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.util import await_only
+from sqlalchemy.orm import (
+    Session,
+    sessionmaker,
+    declarative_base,
+    contains_eager,
+    joinedload,
+    load_only,
+    relationship,
 )
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship
 from decouple import config
-from pydantic import BaseModel
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    TypeAdapter,
+    ValidationError,
+    create_model,
+    field_validator,
+    model_validator,
+)
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+
+import banco_local
+import metricas
+from cache import criar_cache
+
+# Referência para medir o tempo de inicialização da aplicação
+INICIO = time.perf_counter()
+
+logger = logging.getLogger(__name__)
+
+# Configuração do banco de dados. DATABASE_URL aceita qualquer URL do
+# SQLAlchemy (ex.: sqlite:///economed.db para testes locais); sem ela, a URL do
+# SQL Server é montada com as credenciais do .env
+DATABASE_URL = config("DATABASE_URL", default=None)
+
+# Driver assíncrono equivalente a cada driver síncrono, usado com DB_ASYNC
+DRIVERS_ASSINCRONOS = {
+    "mssql+pyodbc": "mssql+aioodbc",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def url_banco():
+    if DATABASE_URL:
+        return make_url(DATABASE_URL)
+    return URL.create(
+        "mssql+pyodbc",
+        username=config("DB_USER"),
+        password=config("DB_PASSWORD"),
+        host=config("DB_SERVER"),
+        database=config("DB_NAME"),
+        query={"driver": "ODBC Driver 17 for SQL Server"},
+    )
 
-# Configuração do banco de dados usando credenciais do .env
-DATABASE_URL = f"mssql+pyodbc://{config('DB_USER')}:{config('DB_PASSWORD')}@{config('DB_SERVER')}/{config('DB_NAME')}?driver=ODBC+Driver+17+for+SQL+Server"
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def url_banco_async():
+    url = url_banco()
+    return url.set(drivername=DRIVERS_ASSINCRONOS.get(url.drivername, url.drivername))
+
+
+# Pool de conexões. O pre-ping e a reciclagem evitam erros na primeira requisição
+# depois de um período ocioso, quando o Azure SQL já encerrou a conexão
+OPCOES_POOL = {
+    "pool_size": config("DB_POOL_SIZE", default=5, cast=int),
+    "max_overflow": config("DB_MAX_OVERFLOW", default=10, cast=int),
+    "pool_timeout": config("DB_POOL_TIMEOUT", default=30, cast=float),
+    "pool_recycle": config("DB_POOL_RECYCLE", default=1800, cast=int),
+    "pool_pre_ping": config("DB_POOL_PRE_PING", default=True, cast=bool),
+}
+
+
+def opcoes_engine(url):
+    if url.get_backend_name() == "sqlite":
+        return banco_local.opcoes_sqlite(url, OPCOES_POOL)
+    opcoes = dict(OPCOES_POOL)
+    # fast_executemany faz o pyodbc enviar os parâmetros das operações em lote
+    # de uma vez
+    if url.drivername == "mssql+pyodbc":
+        opcoes["fast_executemany"] = True
+    return opcoes
+
+
+def criar_engine(url, fabrica, opcoes):
+    engine = fabrica(url, **opcoes)
+    engine_sincrono = getattr(engine, "sync_engine", engine)
+    if url.get_backend_name() == "sqlite":
+        banco_local.configurar_sqlite(engine_sincrono)
+    metricas.instrumentar_engine(engine_sincrono)
+    return engine
+
+
+# Com SQLite, um banco vazio é criado pelas migrações na inicialização e
+# populado com os dados de exemplo do sql/inserts.sql
+DB_DADOS_EXEMPLO = config("DB_DADOS_EXEMPLO", default=True, cast=bool)
+
+# Modo assíncrono: as rotas passam a usar AsyncSession (aioodbc) sem ocupar
+# threads do threadpool enquanto aguardam o banco
+DB_ASYNC = config("DB_ASYNC", default=False, cast=bool)
+
+# Conexões abertas em segundo plano na inicialização, para que as primeiras
+# requisições não paguem o login no banco (0 desativa o aquecimento)
+DB_AQUECER = config("DB_AQUECER", default=OPCOES_POOL["pool_size"], cast=int)
+
+
+class Banco:
+    # Engines e fábricas de sessão criados no primeiro uso: importar o módulo
+    # não exige credenciais nem um banco acessível. O lifespan da aplicação os
+    # cria na inicialização, aquece o pool em segundo plano e os descarta ao
+    # encerrar. O max_overflow de cada engine, que o pool não expõe, é guardado
+    # na criação
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._engine = None
+        self._engine_async = None
+        self._max_overflow = None
+        self._max_overflow_async = None
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+        self.AsyncSessionLocal = async_sessionmaker(autoflush=False)
+        self.estado = "frio"
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self.lock:
+                if self._engine is None:
+                    url = url_banco()
+                    opcoes = opcoes_engine(url)
+                    self._engine = criar_engine(url, create_engine, opcoes)
+                    self._max_overflow = opcoes["max_overflow"]
+        return self._engine
+
+    @property
+    def engine_async(self):
+        if self._engine_async is None:
+            with self.lock:
+                if self._engine_async is None:
+                    url = url_banco_async()
+                    opcoes = opcoes_engine(url)
+                    self._engine_async = criar_engine(url, create_async_engine, opcoes)
+                    self._max_overflow_async = opcoes["max_overflow"]
+        return self._engine_async
+
+    def sessao(self):
+        return self.SessionLocal(bind=self.engine)
+
+    def sessao_async(self):
+        return self.AsyncSessionLocal(bind=self.engine_async)
+
+    @property
+    def pool(self):
+        return self.engine_async.pool if DB_ASYNC else self.engine.pool
+
+    @property
+    def max_overflow(self):
+        # Do engine em uso, depois de criado (pelo acesso a pool, por exemplo)
+        return self._max_overflow_async if DB_ASYNC else self._max_overflow
+
+    def preparar_sqlite(self):
+        with self.engine.begin() as conexao:
+            banco_local.preparar(conexao, DB_DADOS_EXEMPLO)
+
+    async def preparar(self):
+        if DB_ASYNC:
+            if self.engine_async.dialect.name == "sqlite":
+                async with self.engine_async.begin() as conexao:
+                    await conexao.run_sync(banco_local.preparar, DB_DADOS_EXEMPLO)
+        elif self.engine.dialect.name == "sqlite":
+            await run_in_threadpool(self.preparar_sqlite)
+
+    async def aquecer(self, quantidade):
+        # Abre as conexões ao mesmo tempo e as devolve ao pool
+        self.estado = "aquecendo"
+        if DB_ASYNC:
+            abrir = self.engine_async.connect
+        else:
+            abrir = functools.partial(run_in_threadpool, self.engine.connect)
+        conexoes = await asyncio.gather(
+            *(abrir() for _ in range(quantidade)), return_exceptions=True
+        )
+        erros = [conexao for conexao in conexoes if isinstance(conexao, Exception)]
+        for conexao in conexoes:
+            if conexao in erros:
+                continue
+            if DB_ASYNC:
+                await conexao.close()
+            else:
+                conexao.close()
+        if erros:
+            # A API continua no ar: as requisições abrem as conexões sob demanda.
+            # O detalhe do erro vai só para o log, não para o /health
+            logger.error("Falha ao aquecer o pool de conexões", exc_info=erros[0])
+            self.estado = "erro"
+        else:
+            self.estado = "pronto"
+
+    async def encerrar(self):
+        if self._engine_async is not None:
+            await self._engine_async.dispose()
+        if self._engine is not None:
+            self._engine.dispose()
+
+
+banco = Banco()
+
+# Paginação por cursor (keyset no id) das rotas de listagem
+PAGINA_PADRAO = config("PAGINA_PADRAO", default=100, cast=int)
+PAGINA_MAXIMA = config("PAGINA_MAXIMA", default=1000, cast=int)
+
+Limite = Annotated[int, Query(ge=1, le=PAGINA_MAXIMA)]
+
+# Relacionamentos a incluir na resposta, separados por vírgula
+# (ex.: ?expand=convenio,estado_civil ou ?expand=cidade.estado)
+Expand = Annotated[Optional[str], Query()]
+
+# Quantidade de linhas lidas do banco por vez nas exportações em NDJSON
+EXPORTACAO_LOTE = config("EXPORTACAO_LOTE", default=1000, cast=int)
+
+# Limite de itens por requisição nas rotas "/bulk"
+BULK_MAXIMO = config("BULK_MAXIMO", default=50000, cast=int)
+# Quantidade de ids por cláusula IN (o SQL Server aceita até 2100 parâmetros)
+LOTE_IDS = 1000
+
+# Cache das rotas de leitura das tabelas de referência (estados, cidades, ...).
+# CACHE_BACKEND=redis com CACHE_URL=redis://... compartilha o cache entre workers
+CACHE_TTL = config("CACHE_TTL", default=300, cast=int)
+cache = criar_cache(
+    config("CACHE_BACKEND", default="memoria"),
+    maximo=config("CACHE_MAXIMO", default=1024, cast=int),
+    ttl=CACHE_TTL,
+    url=config("CACHE_URL", default=None),
+)
+
+# Confere na inicialização se o banco tem os índices declarados nos modelos e
+# impede a subida da API caso falte algum
+DB_VERIFICAR_INDICES = config("DB_VERIFICAR_INDICES", default=False, cast=bool)
+
+# Group commit das inserções de históricos: os POST de /historicos_saude_cliente/
+# e /historicos_hospital_cliente/ entram numa fila gravada em lotes de até
+# GRUPO_MAXIMO itens numa única transação, esperando no máximo GRUPO_ESPERA_MS
+# pelos itens seguintes de cada lote. Cada requisição espera a gravação do
+# próprio item por até GRUPO_TIMEOUT segundos
+GRUPO_COMMIT = config("GRUPO_COMMIT", default=False, cast=bool)
+GRUPO_MAXIMO = config("GRUPO_MAXIMO", default=100, cast=int)
+GRUPO_ESPERA_MS = config("GRUPO_ESPERA_MS", default=5, cast=float)
+GRUPO_TIMEOUT = config("GRUPO_TIMEOUT", default=30, cast=float)
+
+# Trilha de auditoria das escritas em todas as tabelas (tabela AUDITORIA_CP1).
+# As alterações confirmadas entram numa fila de até AUDITORIA_BUFFER registros,
+# gravada em segundo plano em lotes de até AUDITORIA_LOTE, esperando no máximo
+# AUDITORIA_ESPERA_MS pelos registros seguintes de cada lote. Com a fila cheia,
+# o commit espera a gravação abrir espaço. Um lote rejeitado pelo banco é
+# repetido até AUDITORIA_TENTATIVAS vezes, com espera crescente entre elas
+AUDITORIA = config("AUDITORIA", default=True, cast=bool)
+AUDITORIA_LOTE = config("AUDITORIA_LOTE", default=500, cast=int)
+AUDITORIA_ESPERA_MS = config("AUDITORIA_ESPERA_MS", default=50, cast=float)
+AUDITORIA_BUFFER = config("AUDITORIA_BUFFER", default=10000, cast=int)
+AUDITORIA_TENTATIVAS = config("AUDITORIA_TENTATIVAS", default=3, cast=int)
 
 Base = declarative_base()
 
-app = FastAPI()
+
+@contextlib.asynccontextmanager
+async def ciclo_de_vida(app):
+    await banco.preparar()
+    if DB_VERIFICAR_INDICES:
+        await run_in_threadpool(verificar_indices)
+    if AUDITORIA:
+        auditoria.iniciar()
+    if GRUPO_COMMIT:
+        for grupo in GRUPOS.values():
+            grupo.iniciar()
+    # O pool é aquecido em segundo plano: a API já responde enquanto isso
+    aquecimento = None
+    if DB_AQUECER > 0:
+        aquecimento = asyncio.create_task(
+            banco.aquecer(min(DB_AQUECER, banco.pool.size()))
+        )
+    app.state.inicializacao = time.perf_counter() - INICIO
+    try:
+        yield
+    finally:
+        if aquecimento is not None:
+            aquecimento.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await aquecimento
+        if GRUPO_COMMIT:
+            for grupo in GRUPOS.values():
+                await grupo.encerrar()
+        # Depois dos grupos, cujos commits ainda geram registros de auditoria
+        if AUDITORIA:
+            await auditoria.encerrar()
+        await banco.encerrar()
+
+
+app = FastAPI(lifespan=ciclo_de_vida)
+
+
+# Esquemas das respostas
+class RespostaORM(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    # Usa só os atributos já carregados do objeto ORM: relacionamentos que não
+    # foram pedidos em expand ficam de fora em vez de disparar uma consulta
+    @model_validator(mode="before")
+    @classmethod
+    def atributos_carregados(cls, dados):
+        if isinstance(dados, Base):
+            return {
+                nome: valor
+                for nome, valor in vars(dados).items()
+                if not nome.startswith("_")
+            }
+        return dados
+
+
+T = TypeVar("T")
+
+
+class Pagina(BaseModel, Generic[T]):
+    items: List[T]
+    next: Optional[int] = None
+
+
+class Mensagem(BaseModel):
+    message: str
 
 
 # Modelos de Tabelas
 class Estado(Base):
     __tablename__ = "CP1_ESTADO"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     nome = Column(String(20))
 
 
@@ -35,11 +396,18 @@ class EstadoRequest(BaseModel):
     nome: str
 
 
+class EstadoResponse(RespostaORM):
+    id: int
+    nome: Optional[str] = None
+
+
 class Cidade(Base):
     __tablename__ = "CP1_CIDADE"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     nome = Column(String(20))
-    estado_id = Column(Integer, ForeignKey("CP1_ESTADO.id"))
+    estado_id = Column(
+        Integer, ForeignKey("CP1_ESTADO.id", ondelete="CASCADE"), index=True
+    )
     estado = relationship("Estado")
 
 
@@ -48,10 +416,17 @@ class CidadeRequest(BaseModel):
     estado_id: int
 
 
+class CidadeResponse(RespostaORM):
+    id: int
+    nome: Optional[str] = None
+    estado_id: Optional[int] = None
+    estado: Optional[EstadoResponse] = None
+
+
 class Empresa(Base):
     __tablename__ = "CP1_EMPRESA"
-    id = Column(Integer, primary_key=True, index=True)
-    cnpj = Column(String(20), unique=True)
+    id = Column(Integer, primary_key=True)
+    cnpj = Column(String(20), unique=True, index=True)
     nome = Column(String(100))
     tipo = Column(String(100))
     telefone = Column(String(20))
@@ -66,10 +441,21 @@ class EmpresaRequest(BaseModel):
     email: str
 
 
+class EmpresaResponse(RespostaORM):
+    id: int
+    cnpj: Optional[str] = None
+    nome: Optional[str] = None
+    tipo: Optional[str] = None
+    telefone: Optional[str] = None
+    email: Optional[str] = None
+
+
 class Convenio(Base):
     __tablename__ = "CP1_CONVENIO"
-    id = Column(Integer, primary_key=True, index=True)
-    empresa_id = Column(Integer, ForeignKey("CP1_EMPRESA.id"))
+    id = Column(Integer, primary_key=True)
+    empresa_id = Column(
+        Integer, ForeignKey("CP1_EMPRESA.id", ondelete="CASCADE"), index=True
+    )
     nome = Column(String(100))
     valor = Column(Float)
     tipo_servico = Column(String(100))
@@ -86,12 +472,24 @@ class ConvenioRequest(BaseModel):
     tipo_servico: str
     cobertura: str
     contato: str
-    validade: str
+    validade: date
+
+
+class ConvenioResponse(RespostaORM):
+    id: int
+    empresa_id: Optional[int] = None
+    nome: Optional[str] = None
+    valor: Optional[float] = None
+    tipo_servico: Optional[str] = None
+    cobertura: Optional[str] = None
+    contato: Optional[str] = None
+    validade: Optional[date] = None
+    empresa: Optional[EmpresaResponse] = None
 
 
 class AreaAtuacao(Base):
     __tablename__ = "CP1_AREA_ATUACAO"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     nome = Column(String(100))
 
 
@@ -99,11 +497,20 @@ class AreaAtuacaoRequest(BaseModel):
     nome: str
 
 
+class AreaAtuacaoResponse(RespostaORM):
+    id: int
+    nome: Optional[str] = None
+
+
 class Unidade(Base):
     __tablename__ = "CP1_UNIDADE"
-    id = Column(Integer, primary_key=True, index=True)
-    empresa_id = Column(Integer, ForeignKey("CP1_EMPRESA.id"))
-    area_atuacao_id = Column(Integer, ForeignKey("CP1_AREA_ATUACAO.id"))
+    id = Column(Integer, primary_key=True)
+    empresa_id = Column(
+        Integer, ForeignKey("CP1_EMPRESA.id", ondelete="CASCADE"), index=True
+    )
+    area_atuacao_id = Column(
+        Integer, ForeignKey("CP1_AREA_ATUACAO.id", ondelete="CASCADE"), index=True
+    )
     nome = Column(String(100))
     telefone = Column(String(20))
     email = Column(String(100))
@@ -111,6 +518,7 @@ class Unidade(Base):
     capacidade = Column(Integer)
     empresa = relationship("Empresa")
     area_atuacao = relationship("AreaAtuacao")
+    endereco = relationship("EnderecoUnidade", uselist=False, viewonly=True)
 
 
 class UnidadeRequest(BaseModel):
@@ -123,14 +531,35 @@ class UnidadeRequest(BaseModel):
     capacidade: int
 
 
+class UnidadeResponse(RespostaORM):
+    id: int
+    empresa_id: Optional[int] = None
+    area_atuacao_id: Optional[int] = None
+    nome: Optional[str] = None
+    telefone: Optional[str] = None
+    email: Optional[str] = None
+    tipo: Optional[str] = None
+    capacidade: Optional[int] = None
+    empresa: Optional[EmpresaResponse] = None
+    area_atuacao: Optional[AreaAtuacaoResponse] = None
+    endereco: Optional["EnderecoUnidadeResponse"] = None
+
+
 class EnderecoUnidade(Base):
     __tablename__ = "CP1_ENDERECO_UNIDADE"
-    id = Column(Integer, primary_key=True, index=True)
-    unidade_id = Column(Integer, ForeignKey("CP1_UNIDADE.id"), unique=True)
+    id = Column(Integer, primary_key=True)
+    unidade_id = Column(
+        Integer,
+        ForeignKey("CP1_UNIDADE.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,
+    )
     rua = Column(String(100))
     numero = Column(String(10))
     cep = Column(String(20))
-    cidade_id = Column(Integer, ForeignKey("CP1_CIDADE.id"))
+    cidade_id = Column(
+        Integer, ForeignKey("CP1_CIDADE.id", ondelete="CASCADE"), index=True
+    )
     unidade = relationship("Unidade")
     cidade = relationship("Cidade")
 
@@ -143,14 +572,25 @@ class EnderecoUnidadeRequest(BaseModel):
     cidade_id: int
 
 
+class EnderecoUnidadeResponse(RespostaORM):
+    id: int
+    unidade_id: Optional[int] = None
+    rua: Optional[str] = None
+    numero: Optional[str] = None
+    cep: Optional[str] = None
+    cidade_id: Optional[int] = None
+    unidade: Optional[UnidadeResponse] = None
+    cidade: Optional[CidadeResponse] = None
+
+
 class Medico(Base):
     __tablename__ = "CP1_MEDICO"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     nome = Column(String(100))
     telefone = Column(String(20))
     email = Column(String(100))
-    especialidade = Column(String(100))
-    crm = Column(String(20))
+    especialidade = Column(String(100), index=True)
+    crm = Column(String(20), index=True)
 
 
 class MedicoRequest(BaseModel):
@@ -161,11 +601,31 @@ class MedicoRequest(BaseModel):
     crm: str
 
 
+class MedicoResponse(RespostaORM):
+    id: int
+    nome: Optional[str] = None
+    telefone: Optional[str] = None
+    email: Optional[str] = None
+    especialidade: Optional[str] = None
+    crm: Optional[str] = None
+
+
 class MedicoUnidade(Base):
     __tablename__ = "CP1_MEDICO_UNIDADE"
-    id = Column(Integer, primary_key=True, index=True)
-    medico_id = Column(Integer, ForeignKey("CP1_MEDICO.id"), nullable=False)
-    unidade_id = Column(Integer, ForeignKey("CP1_UNIDADE.id"), nullable=False)
+    # O índice composto também atende às buscas só por medico_id
+    __table_args__ = (
+        Index("ix_CP1_MEDICO_UNIDADE_medico_unidade", "medico_id", "unidade_id"),
+    )
+    id = Column(Integer, primary_key=True)
+    medico_id = Column(
+        Integer, ForeignKey("CP1_MEDICO.id", ondelete="CASCADE"), nullable=False
+    )
+    unidade_id = Column(
+        Integer,
+        ForeignKey("CP1_UNIDADE.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
     horario_atendimento = Column(String(100))
     medico = relationship("Medico")
     unidade = relationship("Unidade")
@@ -177,9 +637,18 @@ class MedicoUnidadeRequest(BaseModel):
     horario_atendimento: str
 
 
+class MedicoUnidadeResponse(RespostaORM):
+    id: int
+    medico_id: Optional[int] = None
+    unidade_id: Optional[int] = None
+    horario_atendimento: Optional[str] = None
+    medico: Optional[MedicoResponse] = None
+    unidade: Optional[UnidadeResponse] = None
+
+
 class EstadoCivil(Base):
     __tablename__ = "CP1_ESTADO_CIVIL"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     nome = Column(String(20))
 
 
@@ -187,20 +656,38 @@ class EstadoCivilRequest(BaseModel):
     nome: str
 
 
+class EstadoCivilResponse(RespostaORM):
+    id: int
+    nome: Optional[str] = None
+
+
 class Cliente(Base):
     __tablename__ = "CP1_CLIENTE"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     rg = Column(String(20))
     nome = Column(String(100))
     sexo = Column(CHAR(1))
     telefone = Column(String(20))
     email = Column(String(100))
     data_nascimento = Column(Date)
-    cpf = Column(String(20))
-    convenio_id = Column(Integer, ForeignKey("CP1_CONVENIO.id"))
-    estado_civil_id = Column(Integer, ForeignKey("CP1_ESTADO_CIVIL.id"))
+    cpf = Column(String(20), index=True)
+    convenio_id = Column(
+        Integer, ForeignKey("CP1_CONVENIO.id", ondelete="CASCADE"), index=True
+    )
+    estado_civil_id = Column(
+        Integer, ForeignKey("CP1_ESTADO_CIVIL.id", ondelete="CASCADE"), index=True
+    )
     convenio = relationship("Convenio")
     estado_civil = relationship("EstadoCivil")
+    # Lado inverso das chaves únicas por cliente, só para leitura: as linhas
+    # são gravadas pelas rotas de cada tabela
+    endereco = relationship("EnderecoCliente", uselist=False, viewonly=True)
+    historico_saude = relationship(
+        "HistoricoSaudeCliente", uselist=False, viewonly=True
+    )
+    historico_hospital = relationship(
+        "HistoricoHospitalCliente", uselist=False, viewonly=True
+    )
 
 
 class ClienteRequest(BaseModel):
@@ -209,35 +696,76 @@ class ClienteRequest(BaseModel):
     sexo: str
     telefone: str
     email: str
-    data_nascimento: str
+    data_nascimento: date
     cpf: str
     convenio_id: int
     estado_civil_id: int
 
 
+class ClienteResponse(RespostaORM):
+    id: int
+    rg: Optional[str] = None
+    nome: Optional[str] = None
+    sexo: Optional[str] = None
+    telefone: Optional[str] = None
+    email: Optional[str] = None
+    data_nascimento: Optional[date] = None
+    cpf: Optional[str] = None
+    convenio_id: Optional[int] = None
+    estado_civil_id: Optional[int] = None
+    convenio: Optional[ConvenioResponse] = None
+    estado_civil: Optional[EstadoCivilResponse] = None
+    endereco: Optional["EnderecoClienteResponse"] = None
+    historico_saude: Optional["HistoricoSaudeClienteResponse"] = None
+    historico_hospital: Optional["HistoricoHospitalClienteResponse"] = None
+
+
 class EnderecoCliente(Base):
     __tablename__ = "CP1_ENDERECO_CLIENTE"
-    id = Column(Integer, primary_key=True, index=True)
-    cliente_id = Column(Integer, ForeignKey("CP1_CLIENTE.id"), unique=True)
+    id = Column(Integer, primary_key=True)
+    cliente_id = Column(
+        Integer,
+        ForeignKey("CP1_CLIENTE.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,
+    )
     rua = Column(String(100))
     numero = Column(String(10))
     cep = Column(String(20))
-    cidade_id = Column(Integer, ForeignKey("CP1_CIDADE.id"))
+    cidade_id = Column(
+        Integer, ForeignKey("CP1_CIDADE.id", ondelete="CASCADE"), index=True
+    )
     cliente = relationship("Cliente")
     cidade = relationship("Cidade")
 
 
-class EnderecoClienteRequest(BaseModel):
-    cliente_id: int
+# Campos gravados pelo PUT /clientes/{cliente_id}/endereco, em que o cliente
+# vem do caminho
+class EnderecoClienteDados(BaseModel):
     rua: str
     numero: str
     cep: str
     cidade_id: int
 
 
+class EnderecoClienteRequest(EnderecoClienteDados):
+    cliente_id: int
+
+
+class EnderecoClienteResponse(RespostaORM):
+    id: int
+    cliente_id: Optional[int] = None
+    rua: Optional[str] = None
+    numero: Optional[str] = None
+    cep: Optional[str] = None
+    cidade_id: Optional[int] = None
+    cliente: Optional[ClienteResponse] = None
+    cidade: Optional[CidadeResponse] = None
+
+
 class Comorbidade(Base):
     __tablename__ = "CP1_COMORBIDADE"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     nome = Column(String(100))
 
 
@@ -245,11 +773,23 @@ class ComorbidadeRequest(BaseModel):
     nome: str
 
 
+class ComorbidadeResponse(RespostaORM):
+    id: int
+    nome: Optional[str] = None
+
+
 class HistoricoSaudeCliente(Base):
     __tablename__ = "CP1_HISTORICO_SAUDE_CLIENTE"
-    id = Column(Integer, primary_key=True, index=True)
-    cliente_id = Column(Integer, ForeignKey("CP1_CLIENTE.id"), unique=True)
-    comorbidade_id = Column(Integer, ForeignKey("CP1_COMORBIDADE.id"))
+    id = Column(Integer, primary_key=True)
+    cliente_id = Column(
+        Integer,
+        ForeignKey("CP1_CLIENTE.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,
+    )
+    comorbidade_id = Column(
+        Integer, ForeignKey("CP1_COMORBIDADE.id", ondelete="CASCADE"), index=True
+    )
     data_registro = Column(Date)
     fuma = Column(Integer)
     observacoes = Column(String(100))
@@ -257,18 +797,37 @@ class HistoricoSaudeCliente(Base):
     comorbidade = relationship("Comorbidade")
 
 
-class HistoricoSaudeClienteRequest(BaseModel):
-    cliente_id: int
+class HistoricoSaudeClienteDados(BaseModel):
     comorbidade_id: int
-    data_registro: str
+    data_registro: date
     fuma: int
     observacoes: str
 
 
+class HistoricoSaudeClienteRequest(HistoricoSaudeClienteDados):
+    cliente_id: int
+
+
+class HistoricoSaudeClienteResponse(RespostaORM):
+    id: int
+    cliente_id: Optional[int] = None
+    comorbidade_id: Optional[int] = None
+    data_registro: Optional[date] = None
+    fuma: Optional[int] = None
+    observacoes: Optional[str] = None
+    cliente: Optional[ClienteResponse] = None
+    comorbidade: Optional[ComorbidadeResponse] = None
+
+
 class HistoricoHospitalCliente(Base):
     __tablename__ = "CP1_HISTORICO_HOSPITAL_CLIENTE"
-    id = Column(Integer, primary_key=True, index=True)
-    cliente_id = Column(Integer, ForeignKey("CP1_CLIENTE.id"), unique=True)
+    id = Column(Integer, primary_key=True)
+    cliente_id = Column(
+        Integer,
+        ForeignKey("CP1_CLIENTE.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,
+    )
     data_registro = Column(Date)
     historico_medico = Column(String(100))
     exames_realizados = Column(String(100))
@@ -277,828 +836,2000 @@ class HistoricoHospitalCliente(Base):
     cliente = relationship("Cliente")
 
 
-class HistoricoHospitalClienteRequest(BaseModel):
-    cliente_id: int
-    data_registro: str
+class HistoricoHospitalClienteDados(BaseModel):
+    data_registro: date
     historico_medico: str
     exames_realizados: str
     medicamentos_prescritos: str
     observacoes: str
 
 
-Base.metadata.create_all(bind=engine)
-
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-# Rotas
-@app.get("/")
-def read_root():
-    return {"message": "Bem-vindo a API da EconoMed"}
-
-
-@app.get("/estados/")
-def get_estados(db=Depends(get_db)):
-    estados = db.query(Estado).all()
-    return estados
-
-
-@app.get("/estados/{estado_id}")
-def get_estado(estado_id: int, db=Depends(get_db)):
-    estado = db.query(Estado).filter(Estado.id == estado_id).first()
-    return estado
-
-
-@app.post("/estados/")
-def create_estado(estado: EstadoRequest, db=Depends(get_db)):
-    novo_estado = Estado(nome=estado.nome)
-    db.add(novo_estado)
-    db.commit()
-    db.refresh(novo_estado)
-    return novo_estado
-
-
-@app.put("/estados/{estado_id}")
-def update_estado(estado_id: int, estado_request: EstadoRequest, db=Depends(get_db)):
-    estado = db.query(Estado).filter(Estado.id == estado_id).first()
-    estado.nome = estado_request.nome
-    db.commit()
-    db.refresh(estado)
-    return estado
-
-
-@app.delete("/estados/{estado_id}")
-def delete_estado(estado_id: int, db=Depends(get_db)):
-    estado = db.query(Estado).filter(Estado.id == estado_id).first()
-    db.delete(estado)
-    db.commit()
-    return {"message": "Estado deletado com sucesso"}
-
-
-@app.get("/cidades/")
-def get_cidades(db=Depends(get_db)):
-    cidades = db.query(Cidade).all()
-    return cidades
-
-
-@app.get("/cidades/{cidade_id}")
-def get_cidade(cidade_id: int, db=Depends(get_db)):
-    cidade = db.query(Cidade).filter(Cidade.id == cidade_id).first()
-    return cidade
-
-
-@app.post("/cidades/")
-def create_cidade(cidade: CidadeRequest, db=Depends(get_db)):
-    nova_cidade = Cidade(nome=cidade.nome, estado_id=cidade.estado_id)
-    db.add(nova_cidade)
-    db.commit()
-    db.refresh(nova_cidade)
-    return
-
-
-@app.put("/cidades/{cidade_id}")
-def update_cidade(cidade_id: int, cidade_request: CidadeRequest, db=Depends(get_db)):
-    cidade = db.query(Cidade).filter(Cidade.id == cidade_id).first()
-    cidade.nome = cidade_request.nome
-    db.commit()
-    db.refresh(cidade)
-    return cidade
-
-
-@app.delete("/cidades/{cidade_id}")
-def delete_cidade(cidade_id: int, db=Depends(get_db)):
-    cidade = db.query(Cidade).filter(Cidade.id == cidade_id).first()
-    db.delete(cidade)
-    db.commit()
-    return {"message": "Cidade deletada com sucesso"}
-
-
-@app.get("/cidades/estado/{estado_id}")
-def get_cidades_estado(estado_id: int, db=Depends(get_db)):
-    cidades = db.query(Cidade).filter(Cidade.estado_id == estado_id).all()
-    return cidades
-
-
-@app.get("/empresas/")
-def get_empresas(db=Depends(get_db)):
-    empresas = db.query(Empresa).all()
-    return empresas
-
-
-@app.get("/empresas/{empresa_id}")
-def get_empresa(empresa_id: int, db=Depends(get_db)):
-    empresa = db.query(Empresa).filter(Empresa.id == empresa_id).first()
-    return empresa
-
-
-@app.post("/empresas/")
-def create_empresa(empresa: EmpresaRequest, db=Depends(get_db)):
-    nova_empresa = Empresa(
-        cnpj=empresa.cnpj,
-        nome=empresa.nome,
-        tipo=empresa.tipo,
-        telefone=empresa.telefone,
-        email=empresa.email,
-    )
-    db.add(nova_empresa)
-    db.commit()
-    db.refresh(nova_empresa)
-    return nova_empresa
-
-
-@app.put("/empresas/{empresa_id}")
-def update_empresa(empresa_id: int, empresa_request: EmpresaRequest, db=Depends(get_db)):
-    empresa = db.query(Empresa).filter(Empresa.id == empresa_id).first()
-    empresa.cnpj = empresa_request.cnpj
-    empresa.nome = empresa_request.nome
-    empresa.tipo = empresa_request.tipo
-    empresa.telefone = empresa_request.telefone
-    empresa.email = empresa_request.email
-    db.commit()
-    db.refresh(empresa)
-    return empresa
-
-
-@app.delete("/empresas/{empresa_id}")
-def delete_empresa(empresa_id: int, db=Depends(get_db)):
-    empresa = db.query(Empresa).filter(Empresa.id == empresa_id).first()
-    db.delete(empresa)
-    db.commit()
-    return {"message": "Empresa deletada com sucesso"}
-
-
-@app.get("/convenios/")
-def get_convenios(db=Depends(get_db)):
-    convenios = db.query(Convenio).all()
-    return convenios
-
-
-@app.get("/convenios/{convenio_id}")
-def get_convenio(convenio_id: int, db=Depends(get_db)):
-    convenio = db.query(Convenio).filter(Convenio.id == convenio_id).first()
-    return convenio
-
-
-@app.post("/convenios/")
-def create_convenio(convenio: ConvenioRequest, db=Depends(get_db)):
-    novo_convenio = Convenio(
-        empresa_id=convenio.empresa_id,
-        nome=convenio.nome,
-        valor=convenio.valor,
-        tipo_servico=convenio.tipo_servico,
-        cobertura=convenio.cobertura,
-        contato=convenio.contato,
-        validade=convenio.validade,
-    )
-    db.add(novo_convenio)
-    db.commit()
-    db.refresh(novo_convenio)
-    return novo_convenio
-
-
-@app.put("/convenios/{convenio_id}")
-def update_convenio(convenio_id: int, convenio_request: ConvenioRequest, db=Depends(get_db)):
-    convenio = db.query(Convenio).filter(Convenio.id == convenio_id).first()
-    convenio.empresa_id = convenio_request.empresa_id
-    convenio.nome = convenio_request.nome
-    convenio.valor = convenio_request.valor
-    convenio.tipo_servico = convenio_request.tipo_servico
-    convenio.cobertura = convenio_request.cobertura
-    convenio.contato = convenio_request.contato
-    convenio.validade = convenio_request.validade
-    db.commit()
-    db.refresh(convenio)
-    return convenio
-
-
-@app.delete("/convenios/{convenio_id}")
-def delete_convenio(convenio_id: int, db=Depends(get_db)):
-    convenio = db.query(Convenio).filter(Convenio.id == convenio_id).first()
-    db.delete(convenio)
-    db.commit()
-    return {"message": "Convenio deletado com sucesso"}
-
-
-@app.get("/areas_atuacao/")
-def get_areas_atuacao(db=Depends(get_db)):
-    areas_atuacao = db.query(AreaAtuacao).all()
-    return areas_atuacao
+class HistoricoHospitalClienteRequest(HistoricoHospitalClienteDados):
+    cliente_id: int
 
 
-@app.get("/areas_atuacao/{area_atuacao_id}")
-def get_area_atuacao(area_atuacao_id: int, db=Depends(get_db)):
-    area_atuacao = (
-        db.query(AreaAtuacao).filter(AreaAtuacao.id == area_atuacao_id).first()
-    )
-    return area_atuacao
+class HistoricoHospitalClienteResponse(RespostaORM):
+    id: int
+    cliente_id: Optional[int] = None
+    data_registro: Optional[date] = None
+    historico_medico: Optional[str] = None
+    exames_realizados: Optional[str] = None
+    medicamentos_prescritos: Optional[str] = None
+    observacoes: Optional[str] = None
+    cliente: Optional[ClienteResponse] = None
 
 
-@app.post("/areas_atuacao/")
-def create_area_atuacao(area_atuacao: AreaAtuacaoRequest, db=Depends(get_db)):
-    nova_area_atuacao = AreaAtuacao(nome=area_atuacao.nome)
-    db.add(nova_area_atuacao)
-    db.commit()
-    db.refresh(nova_area_atuacao)
-    return nova_area_atuacao
+# Os relacionamentos reversos (expand=endereco, ...) usam schemas declarados
+# depois dos de clientes e unidades
+UnidadeResponse.model_rebuild()
+ClienteResponse.model_rebuild()
 
 
-@app.put("/areas_atuacao/{area_atuacao_id}")
-def update_area_atuacao(
-    area_atuacao_id: int, area_atuacao_request: AreaAtuacaoRequest, db=Depends(get_db)
-):
-    area_atuacao = (
-        db.query(AreaAtuacao).filter(AreaAtuacao.id == area_atuacao_id).first()
+# Trilha de auditoria: uma linha por registro inserido, alterado ou excluído,
+# com as alterações num JSON compacto: os valores gravados no INSERT, os
+# anteriores no DELETE e [antes, depois] só dos campos alterados no UPDATE
+class Auditoria(Base):
+    __tablename__ = "AUDITORIA_CP1"
+    __table_args__ = (
+        Index("ix_AUDITORIA_CP1_tabela_registro", "tabela", "registro_id", "data"),
     )
-    area_atuacao.nome = area_atuacao_request.nome
-    db.commit()
-    db.refresh(area_atuacao)
-    return area_atuacao
-
-
-@app.delete("/areas_atuacao/{area_atuacao_id}")
-def delete_area_atuacao(area_atuacao_id: int, db=Depends(get_db)):
-    area_atuacao = (
-        db.query(AreaAtuacao).filter(AreaAtuacao.id == area_atuacao_id).first()
+    id = Column(Integer, primary_key=True)
+    data = Column(DateTime, nullable=False, index=True)
+    tabela = Column(String(50), nullable=False)
+    registro_id = Column(Integer, nullable=False)
+    operacao = Column(String(10), nullable=False)
+    alteracoes = Column(UnicodeText, nullable=False)
+
+
+class AuditoriaResponse(RespostaORM):
+    id: int
+    data: Optional[datetime] = None
+    tabela: Optional[str] = None
+    registro_id: Optional[int] = None
+    operacao: Optional[str] = None
+    alteracoes: Optional[Dict[str, Any]] = None
+
+    @field_validator("alteracoes", mode="before")
+    @classmethod
+    def ler_alteracoes(cls, valor):
+        return json.loads(valor) if isinstance(valor, str) else valor
+
+
+def indices_ausentes(conexao):
+    # Índices declarados nos modelos que não existem no banco, comparados pelas
+    # colunas (os nomes podem variar em bancos criados por outros meios). A chave
+    # primária e as restrições UNIQUE também contam, pois já criam um índice
+    inspetor = sa_inspect(conexao)
+    ausentes = []
+    for tabela in Base.metadata.sorted_tables:
+        existentes = {
+            tuple(coluna.lower() for coluna in indice["column_names"])
+            for indice in itertools.chain(
+                inspetor.get_indexes(tabela.name),
+                inspetor.get_unique_constraints(tabela.name),
+            )
+        }
+        primaria = inspetor.get_pk_constraint(tabela.name)["constrained_columns"]
+        existentes.add(tuple(coluna.lower() for coluna in primaria))
+        for indice in tabela.indexes:
+            colunas = tuple(coluna.name.lower() for coluna in indice.columns)
+            if colunas not in existentes:
+                ausentes.append(f"{tabela.name}({', '.join(colunas)})")
+    return ausentes
+
+
+def verificar_indices():
+    with banco.engine.connect() as conexao:
+        ausentes = indices_ausentes(conexao)
+    if ausentes:
+        raise RuntimeError(f"Índices ausentes no banco: {'; '.join(ausentes)}")
+
+
+@functools.cache
+def tabelas_referenciadas(nome_tabela):
+    # A própria tabela e as que ela referencia por chave estrangeira, direta ou
+    # indiretamente (ex.: CP1_CIDADE -> CP1_ESTADO)
+    tabelas = {nome_tabela}
+    for chave in Base.metadata.tables[nome_tabela].foreign_keys:
+        tabelas |= tabelas_referenciadas(chave.column.table.name)
+    return frozenset(tabelas)
+
+
+@functools.cache
+def tabelas_dependentes(nome_tabela):
+    # A própria tabela e as que a referenciam, afetadas pelo ON DELETE CASCADE
+    tabelas = {nome_tabela}
+    for tabela in Base.metadata.tables.values():
+        if any(chave.column.table.name == nome_tabela for chave in tabela.foreign_keys):
+            if tabela.name not in tabelas:
+                tabelas |= tabelas_dependentes(tabela.name)
+    return frozenset(tabelas)
+
+
+def modelos_do_expand(modelo, expand):
+    # Modelos alcançados pelos caminhos de expand, inclusive pelos
+    # relacionamentos reversos (ex.: Cliente.endereco), que as chaves
+    # estrangeiras do modelo não alcançam. Caminhos inválidos são ignorados: a
+    # rota responde 400
+    modelos = set()
+    for caminho in filter(None, (parte.strip() for parte in (expand or "").split(","))):
+        atual = modelo
+        for nome in caminho.split("."):
+            relacao = sa_inspect(atual).relationships.get(nome)
+            if relacao is None:
+                break
+            atual = relacao.mapper.class_
+            modelos.add(atual)
+    return modelos
+
+
+@functools.lru_cache(maxsize=1024)
+def tabelas_lidas(modelos, expand=None):
+    # Tabelas de que a resposta depende: as referenciadas pelos modelos da rota
+    # e pelos relacionamentos pedidos em expand, que partem do primeiro modelo
+    modelos = set(modelos) | modelos_do_expand(modelos[0], expand)
+    return sorted(
+        set().union(
+            *(tabelas_referenciadas(modelo.__tablename__) for modelo in modelos)
+        )
     )
-    db.delete(area_atuacao)
-    db.commit()
-    return {"message": "Area de atuacao deletada com sucesso"}
-
-
-@app.get("/unidades/")
-def get_unidades(db=Depends(get_db)):
-    unidades = db.query(Unidade).all()
-    return unidades
-
 
-@app.get("/unidades/{unidade_id}")
-def get_unidade(unidade_id: int, db=Depends(get_db)):
-    unidade = db.query(Unidade).filter(Unidade.id == unidade_id).first()
-    return unidade
 
+# Registro das tabelas alteradas em cada transação, tanto pelo flush da sessão
+# quanto por INSERT/UPDATE/DELETE executados diretamente
+@event.listens_for(Session, "after_flush")
+def registrar_flush(sessao, contexto):
+    alteradas = sessao.info.setdefault("tabelas_alteradas", set())
+    for objeto in itertools.chain(sessao.new, sessao.dirty, sessao.deleted):
+        alteradas.add(sa_inspect(objeto).mapper.local_table.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def registrar_instrucao(estado):
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        alteradas = estado.session.info.setdefault("tabelas_alteradas", set())
+        alteradas.add(estado.statement.table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidar_cache(sessao):
+    # after_commit também dispara ao liberar um savepoint: as versões só mudam
+    # no commit da transação principal, quando os dados já estão visíveis
+    if sessao.in_nested_transaction():
+        return
+    alteradas = sessao.info.pop("tabelas_alteradas", None)
+    if alteradas:
+        for tabela in set().union(*map(tabelas_dependentes, alteradas)):
+            cache.incrementar_versao(tabela)
+
+
+# Trilha de auditoria. As escritas registram as imagens antes/depois de cada
+# linha na sessão; os registros de um savepoint desfeito são descartados e os
+# demais só vão para a fila de gravação depois do commit da transação, já com
+# a conexão devolvida ao pool
+def auditar(sessao, tabela, antes, depois):
+    if not AUDITORIA:
+        return
+    registro = registro_auditoria(tabela, antes, depois)
+    if registro is not None:
+        sessao.info.setdefault("auditoria", []).append(registro)
+
+
+def registro_auditoria(tabela, antes, depois):
+    # None quando um UPDATE não altera nenhum valor
+    if antes is None:
+        operacao, alteracoes = "INSERT", depois
+    elif depois is None:
+        operacao, alteracoes = "DELETE", antes
+    else:
+        operacao = "UPDATE"
+        alteracoes = {
+            campo: [antes.get(campo), valor]
+            for campo, valor in depois.items()
+            if valor != antes.get(campo)
+        }
+        if not alteracoes:
+            return None
+    return {
+        "data": datetime.now(timezone.utc).replace(tzinfo=None),
+        "tabela": tabela,
+        "registro_id": (depois or antes)["id"],
+        "operacao": operacao,
+        "alteracoes": {
+            campo: valor for campo, valor in alteracoes.items() if campo != "id"
+        },
+    }
+
+
+def linhas_auditoria(registros):
+    # Registros no formato da tabela AUDITORIA_CP1, com as alterações em JSON
+    return [
+        {
+            **registro,
+            "alteracoes": json.dumps(
+                registro["alteracoes"],
+                default=str,
+                ensure_ascii=False,
+                separators=(",", ":"),
+            ),
+        }
+        for registro in registros
+    ]
+
+
+def auditar_cascata(sessao, tabela, ids):
+    # Linhas que o ON DELETE CASCADE remove junto com os ids da tabela, lidas
+    # antes do DELETE (o banco não as devolve) e auditadas como excluídas. A
+    # leitura usa a conexão, sem passar pelo autoflush da sessão, em partes de
+    # até LOTE_IDS linhas pela chave primária. Para a memória da requisição não
+    # crescer com a cascata, os registros além de AUDITORIA_LOTE pendentes na
+    # sessão são gravados já na transação do DELETE (e desfeitos com ela)
+    if not AUDITORIA or not ids:
+        return
+    for dependente in Base.metadata.sorted_tables:
+        for chave in dependente.foreign_keys:
+            if chave.column.table is not tabela or chave.ondelete != "CASCADE":
+                continue
+            for inicio in range(0, len(ids), LOTE_IDS):
+                comando = (
+                    select(dependente)
+                    .where(chave.parent.in_(ids[inicio : inicio + LOTE_IDS]))
+                    .order_by(dependente.c.id)
+                    .limit(LOTE_IDS)
+                )
+                linhas = sessao.connection().execute(comando).mappings().all()
+                while linhas:
+                    auditar_cascata(
+                        sessao, dependente, [linha["id"] for linha in linhas]
+                    )
+                    registros = [
+                        registro_auditoria(dependente.name, dict(linha), None)
+                        for linha in linhas
+                    ]
+                    pendentes = sessao.info.setdefault("auditoria", [])
+                    if len(pendentes) + len(registros) <= AUDITORIA_LOTE:
+                        pendentes += registros
+                    else:
+                        sessao.connection().execute(
+                            insert(Auditoria.__table__), linhas_auditoria(registros)
+                        )
+                    if len(linhas) < LOTE_IDS:
+                        break
+                    linhas = (
+                        sessao.connection()
+                        .execute(comando.where(dependente.c.id > linhas[-1]["id"]))
+                        .mappings()
+                        .all()
+                    )
+
+
+def imagem(estado, anterior=False):
+    # Colunas carregadas no objeto; com anterior, os valores de antes das
+    # alterações do flush
+    valores = {}
+    for atributo in estado.mapper.column_attrs:
+        if atributo.key not in estado.dict:
+            continue
+        valores[atributo.key] = estado.dict[atributo.key]
+        if anterior:
+            historico = estado.attrs[atributo.key].history
+            if historico.deleted:
+                valores[atributo.key] = historico.deleted[0]
+    return valores
+
+
+# Objetos gravados pelo unit of work (session.add, alterações de atributos,
+# session.delete); as escritas diretas das rotas chamam auditar
+@event.listens_for(Session, "after_flush")
+def auditar_flush(sessao, contexto):
+    if not AUDITORIA:
+        return
+    for objeto in sessao.new:
+        estado = sa_inspect(objeto)
+        auditar(sessao, estado.mapper.local_table.name, None, imagem(estado))
+    for objeto in sessao.dirty:
+        estado = sa_inspect(objeto)
+        if sessao.is_modified(objeto):
+            auditar(
+                sessao,
+                estado.mapper.local_table.name,
+                imagem(estado, anterior=True),
+                imagem(estado),
+            )
+    for objeto in sessao.deleted:
+        estado = sa_inspect(objeto)
+        auditar(sessao, estado.mapper.local_table.name, imagem(estado), None)
+
+
+@event.listens_for(Session, "before_flush")
+def auditar_cascata_flush(sessao, contexto, instancias):
+    for objeto in sessao.deleted:
+        estado = sa_inspect(objeto)
+        auditar_cascata(sessao, estado.mapper.local_table, list(estado.identity))
+
+
+@event.listens_for(Session, "after_transaction_create")
+def marcar_savepoint(sessao, transacao):
+    if transacao.nested:
+        marcas = sessao.info.setdefault("auditoria_savepoints", {})
+        marcas[transacao] = len(sessao.info.get("auditoria", ()))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def descartar_auditoria(sessao, transacao):
+    marca = sessao.info.get("auditoria_savepoints", {}).pop(transacao, None)
+    if marca is not None:
+        del sessao.info.get("auditoria", [])[marca:]
+
+
+@event.listens_for(Session, "after_commit")
+def confirmar_auditoria(sessao):
+    # after_commit também é chamado ao liberar um savepoint
+    if not sessao.in_nested_transaction():
+        sessao.info["auditoria_confirmada"] = sessao.info.pop("auditoria", [])
+
+
+@event.listens_for(Session, "after_transaction_end")
+def enfileirar_auditoria(sessao, transacao):
+    if transacao.parent is not None:
+        return
+    confirmados = sessao.info.pop("auditoria_confirmada", None)
+    sessao.info.pop("auditoria", None)
+    sessao.info.pop("auditoria_savepoints", None)
+    if confirmados and auditoria.fila is not None:
+        for registro in confirmados:
+            auditoria.colocar(registro)
+
+
+def em_cache(*modelos):
+    # Serve a rota a partir do cache. As versões são lidas antes da consulta:
+    # se houver uma escrita concorrente, o resultado fica numa chave antiga.
+    # As tabelas incluem as dos relacionamentos pedidos em expand
+    def decorador(rota):
+        @functools.wraps(rota)
+        def rota_em_cache(**kwargs):
+            listagem = kwargs.get("listagem")
+            expand = kwargs.get("expand", getattr(listagem, "expand", None))
+            tabelas = tabelas_lidas(modelos, expand)
+            parametros = sorted(
+                (nome, valor) for nome, valor in kwargs.items() if nome != "db"
+            )
+            chave = f"{rota.__name__}:{cache.versoes(tabelas)}:{parametros}"
+            resultado = cache.get(chave)
+            if resultado is None:
+                resultado = jsonable_encoder(rota(**kwargs))
+                cache.set(chave, resultado)
+            return resultado
+
+        return rota_em_cache
+
+    return decorador
+
+
+class EsperaPool:
+    # Tempo que as requisições aguardam para obter uma conexão do pool
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.quantidade = 0
+        self.total = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, segundos):
+        with self.lock:
+            self.quantidade += 1
+            self.total += segundos
+            self.maximo = max(self.maximo, segundos)
+
+    def resumo(self):
+        with self.lock:
+            return {
+                "count": self.quantidade,
+                "total_ms": round(self.total * 1000, 3),
+                "avg_ms": round(self.total * 1000 / self.quantidade, 3)
+                if self.quantidade
+                else 0.0,
+                "max_ms": round(self.maximo * 1000, 3),
+            }
+
+
+espera_pool = EsperaPool()
+
+
+# A conexão só é obtida na primeira consulta da sessão (rotas servidas pelo
+# cache não usam o pool); a espera é medida entre o início da transação e o
+# momento em que ela recebe a conexão
+@event.listens_for(Session, "after_transaction_create")
+def marcar_inicio_transacao(sessao, transacao):
+    if transacao.parent is None:
+        sessao.info["inicio_transacao"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_begin")
+def registrar_espera_pool(sessao, transacao, conexao):
+    inicio = sessao.info.pop("inicio_transacao", None)
+    if inicio is not None:
+        espera_pool.registrar(time.perf_counter() - inicio)
 
-@app.post("/unidades/")
-def create_unidade(unidade: UnidadeRequest, db=Depends(get_db)):
-    nova_unidade = Unidade(
-        empresa_id=unidade.empresa_id,
-        area_atuacao_id=unidade.area_atuacao_id,
-        nome=unidade.nome,
-        telefone=unidade.telefone,
-        email=unidade.email,
-        tipo=unidade.tipo,
-        capacidade=unidade.capacidade,
-    )
-    db.add(nova_unidade)
-    db.commit()
-    db.refresh(nova_unidade)
-    return nova_unidade
-
-
-@app.put("/unidades/{unidade_id}")
-def update_unidade(unidade_id: int, unidade_request: UnidadeRequest, db=Depends(get_db)):
-    unidade = db.query(Unidade).filter(Unidade.id == unidade_id).first()
-    unidade.empresa_id = unidade_request.empresa_id
-    unidade.area_atuacao_id = unidade_request.area_atuacao_id
-    unidade.nome = unidade_request.nome
-    unidade.telefone = unidade_request.telefone
-    unidade.email = unidade_request.email
-    unidade.tipo = unidade_request.tipo
-    unidade.capacidade = unidade_request.capacidade
-    db.commit()
-    db.refresh(unidade)
-    return unidade
 
-
-@app.delete("/unidades/{unidade_id}")
-def delete_unidade(unidade_id: int, db=Depends(get_db)):
-    unidade = db.query(Unidade).filter(Unidade.id == unidade_id).first()
-    db.delete(unidade)
-    db.commit()
-    return {"message": "Unidade deletada com sucesso"}
+def get_db():
+    db = banco.sessao()
+    try:
+        yield db
+    finally:
+        db.close()
 
 
-@app.get("/enderecos_unidade/")
-def get_enderecos_unidade(db=Depends(get_db)):
-    enderecos_unidade = db.query(EnderecoUnidade).all()
-    return enderecos_unidade
+async def get_async_db():
+    async with banco.sessao_async() as db:
+        yield db
 
 
-@app.get("/enderecos_unidade/{endereco_unidade_id}")
-def get_endereco_unidade(endereco_unidade_id: int, db=Depends(get_db)):
-    endereco_unidade = (
-        db.query(EnderecoUnidade)
-        .filter(EnderecoUnidade.id == endereco_unidade_id)
-        .first()
+def rota_assincrona(endpoint, response_model):
+    # Executa a rota síncrona sobre a AsyncSession com run_sync: o código ORM
+    # continua o mesmo, mas o I/O do banco é feito pelo driver assíncrono. A
+    # conversão para o esquema de resposta acontece ainda dentro do run_sync,
+    # enquanto a sessão está ativa
+    if response_model is None or isinstance(response_model, DefaultPlaceholder):
+        converter = jsonable_encoder
+    else:
+        converter = TypeAdapter(response_model).validate_python
+
+    async def rota(db, **kwargs):
+        return await db.run_sync(
+            lambda sessao: converter(endpoint(db=sessao, **kwargs))
+        )
+
+    assinatura = inspect.signature(endpoint)
+    rota.__signature__ = assinatura.replace(
+        parameters=[
+            parametro.replace(default=Depends(get_async_db))
+            if parametro.name == "db"
+            else parametro
+            for parametro in assinatura.parameters.values()
+        ]
     )
-    return endereco_unidade
-
-
-@app.post("/enderecos_unidade/")
-def create_endereco_unidade(
-    endereco_unidade: EnderecoUnidadeRequest, db=Depends(get_db)
-):
-    novo_endereco_unidade = EnderecoUnidade(
-        unidade_id=endereco_unidade.unidade_id,
-        rua=endereco_unidade.rua,
-        numero=endereco_unidade.numero,
-        cep=endereco_unidade.cep,
-        cidade_id=endereco_unidade.cidade_id,
+    rota.__name__ = endpoint.__name__
+    rota.__doc__ = endpoint.__doc__
+    return rota
+
+
+class RotaBanco(APIRoute):
+    def __init__(self, path, endpoint, **kwargs):
+        # As respostas trazem só os campos carregados: os pedidos em "fields"
+        # e os relacionamentos pedidos em "expand". O decorador do FastAPI sempre
+        # repassa o parâmetro, por isso ele é sobrescrito aqui
+        kwargs["response_model_exclude_unset"] = True
+        if (
+            DB_ASYNC
+            and not inspect.iscoroutinefunction(endpoint)
+            and "db" in inspect.signature(endpoint).parameters
+        ):
+            endpoint = rota_assincrona(endpoint, kwargs.get("response_model"))
+        super().__init__(path, endpoint, **kwargs)
+
+
+app.router.route_class = RotaBanco
+
+
+def opcoes_expand(modelo, expand):
+    # Converte "convenio,cidade.estado" em joinedloads, carregando os
+    # relacionamentos pedidos na mesma consulta do registro principal
+    opcoes = []
+    for caminho in filter(None, (parte.strip() for parte in (expand or "").split(","))):
+        atual, opcao = modelo, None
+        for nome in caminho.split("."):
+            relacao = sa_inspect(atual).relationships.get(nome)
+            if relacao is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Relacionamento inválido em expand: {caminho}",
+                )
+            atributo = getattr(atual, nome)
+            opcao = (
+                joinedload(atributo) if opcao is None else opcao.joinedload(atributo)
+            )
+            atual = relacao.mapper.class_
+        opcoes.append(opcao)
+    return opcoes
+
+
+# Operadores aceitos nos filtros das listagens (campo__operador=valor)
+OPERADORES = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "in": lambda coluna, valores: coluna.in_(valores),
+    "startswith": lambda coluna, valor: coluna.startswith(valor, autoescape=True),
+    "isnull": lambda coluna, nulo: coluna.is_(None) if nulo else coluna.is_not(None),
+}
+
+
+class Listagem:
+    # Parâmetros das rotas de listagem. Os demais parâmetros da query string
+    # são filtros: campo=valor ou campo__operador=valor (ex.: validade__lt=2025-01-01)
+    reservados = {"limit", "after_id", "expand", "sort", "fields"}
+
+    def __init__(
+        self,
+        request: Request,
+        limit: Limite = PAGINA_PADRAO,
+        after_id: Optional[int] = None,
+        expand: Expand = None,
+        sort: Annotated[
+            Optional[str],
+            Query(description="Campos de ordenação; prefixo '-' para decrescente"),
+        ] = None,
+        fields: Annotated[
+            Optional[str], Query(description="Campos a incluir na resposta")
+        ] = None,
+    ):
+        self.limit = limit
+        self.after_id = after_id
+        self.expand = expand
+        self.sort = sort
+        self.fields = fields
+        self.filtros = sorted(
+            (nome, valor)
+            for nome, valor in request.query_params.multi_items()
+            if nome not in self.reservados
+        )
+
+    def remover_filtros(self, *nomes):
+        # Parâmetros próprios da rota, que não são filtros de coluna
+        self.filtros = [filtro for filtro in self.filtros if filtro[0] not in nomes]
+
+    def remover_expand(self, nome):
+        # Relacionamento que a rota já carrega: sai do expand, e os caminhos
+        # pedidos abaixo dele ("endereco.cidade" -> "cidade") são devolvidos
+        caminhos = [
+            parte.strip() for parte in (self.expand or "").split(",") if parte.strip()
+        ]
+        abaixo = [
+            caminho.partition(".")[2]
+            for caminho in caminhos
+            if caminho.partition(".")[0] == nome
+        ]
+        restantes = [
+            caminho for caminho in caminhos if caminho.partition(".")[0] != nome
+        ]
+        self.expand = ",".join(restantes) or None
+        return ",".join(filter(None, abaixo)) or None
+
+    def __repr__(self):
+        # Usado na chave do cache
+        return repr(
+            (
+                self.limit,
+                self.after_id,
+                self.expand,
+                self.sort,
+                self.fields,
+                self.filtros,
+            )
+        )
+
+
+ParametrosListagem = Annotated[Listagem, Depends()]
+
+
+def coluna_do_modelo(modelo, nome):
+    coluna = modelo.__table__.columns.get(nome)
+    if coluna is None:
+        raise HTTPException(status_code=400, detail=f"Campo inválido: {nome}")
+    return coluna
+
+
+def converter_valor(coluna, operador, texto):
+    if operador == "isnull":
+        if texto.lower() not in ("true", "false"):
+            raise ValueError(texto)
+        return texto.lower() == "true"
+    tipo = coluna.type.python_type
+    converter = tipo.fromisoformat if tipo in (date, datetime) else tipo
+    if operador == "in":
+        return [converter(parte) for parte in texto.split(",")]
+    return converter(texto)
+
+
+def condicoes_filtro(modelo, filtros):
+    condicoes = []
+    for parametro, texto in filtros:
+        nome, _, operador = parametro.partition("__")
+        coluna = coluna_do_modelo(modelo, nome)
+        operador = operador or "eq"
+        if operador not in OPERADORES:
+            raise HTTPException(
+                status_code=400, detail=f"Operador de filtro inválido: {parametro}"
+            )
+        if operador == "startswith" and not isinstance(coluna.type, String):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Operador startswith só se aplica a texto: {parametro}",
+            )
+        try:
+            valor = converter_valor(coluna, operador, texto)
+        except ValueError:
+            raise HTTPException(
+                status_code=400, detail=f"Valor inválido para {parametro}: {texto}"
+            )
+        condicoes.append(OPERADORES[operador](coluna, valor))
+    return condicoes
+
+
+def ordenacao(modelo, sort):
+    # Lista de (coluna, decrescente) e se o id, sempre o último critério, é
+    # decrescente. Como o id é único, os campos depois dele não mudam a ordem
+    criterios = []
+    for campo in filter(None, (parte.strip() for parte in (sort or "").split(","))):
+        decrescente = campo.startswith("-")
+        coluna = coluna_do_modelo(modelo, campo.lstrip("-"))
+        if coluna.key == "id":
+            return criterios, decrescente
+        criterios.append((coluna, decrescente))
+    return criterios, False
+
+
+def depois_do_id(coluna_id, after_id, id_decrescente):
+    return coluna_id < after_id if id_decrescente else coluna_id > after_id
+
+
+def depois_do_cursor(criterios, valores, coluna_id, after_id, id_decrescente):
+    # Condição keyset para continuar a listagem depois do registro do cursor.
+    # SQL Server e SQLite ordenam NULL antes dos demais valores, então em ordem
+    # crescente os nulos vêm primeiro e em ordem decrescente por último
+    condicao = depois_do_id(coluna_id, after_id, id_decrescente)
+    for (coluna, decrescente), valor in reversed(list(zip(criterios, valores))):
+        if valor is None:
+            igual = coluna.is_(None)
+            depois = false() if decrescente else coluna.is_not(None)
+        else:
+            igual = coluna == valor
+            if decrescente:
+                depois = or_(coluna < valor, coluna.is_(None))
+            else:
+                depois = coluna > valor
+        condicao = or_(depois, and_(igual, condicao))
+    return condicao
+
+
+def paginar(query, modelo, listagem):
+    query = query.options(*opcoes_expand(modelo, listagem.expand))
+    if listagem.fields:
+        colunas = [
+            coluna_do_modelo(modelo, campo.strip())
+            for campo in listagem.fields.split(",")
+            if campo.strip()
+        ]
+        if not colunas:
+            raise HTTPException(status_code=400, detail="Nenhum campo em fields")
+        query = query.options(
+            load_only(*(getattr(modelo, coluna.key) for coluna in colunas))
+        )
+    query = query.filter(*condicoes_filtro(modelo, listagem.filtros))
+
+    criterios, id_decrescente = ordenacao(modelo, listagem.sort)
+    if listagem.after_id is not None:
+        if criterios:
+            # Valores de ordenação do registro do cursor, lidos pela chave primária
+            valores = query.session.execute(
+                select(*(coluna for coluna, _ in criterios)).where(
+                    modelo.id == listagem.after_id
+                )
+            ).first()
+            if valores is None:
+                raise HTTPException(status_code=400, detail="Cursor after_id inválido")
+            query = query.filter(
+                depois_do_cursor(
+                    criterios, valores, modelo.id, listagem.after_id, id_decrescente
+                )
+            )
+        else:
+            query = query.filter(
+                depois_do_id(modelo.id, listagem.after_id, id_decrescente)
+            )
+    query = query.order_by(
+        *(
+            coluna.desc() if decrescente else coluna.asc()
+            for coluna, decrescente in criterios
+        ),
+        modelo.id.desc() if id_decrescente else modelo.id,
     )
-    db.add(novo_endereco_unidade)
-    db.commit()
-    db.refresh(novo_endereco_unidade)
-    return novo_endereco_unidade
 
-
-@app.put("/enderecos_unidade/{endereco_unidade_id}")
-def update_endereco_unidade(
-    endereco_unidade_id: int,
-    endereco_unidade_request: EnderecoUnidadeRequest,
-    db=Depends(get_db),
-):
-    endereco_unidade = (
-        db.query(EnderecoUnidade)
-        .filter(EnderecoUnidade.id == endereco_unidade_id)
-        .first()
+    # Busca um registro a mais para saber se existe uma próxima página
+    return montar_pagina(query.limit(listagem.limit + 1).all(), listagem.limit)
+
+
+def montar_pagina(itens, limite):
+    proximo = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        proximo = itens[-1].id
+    return {"items": itens, "next": proximo}
+
+
+class Comandos:
+    # Comandos de um modelo montados uma única vez: a cada requisição só mudam
+    # os parâmetros, sem construir a consulta de novo nem recalcular a chave do
+    # cache de compilação do SQLAlchemy, memorizada no próprio comando. As
+    # escritas usam a tabela (Core): as colunas do INSERT e o SET do UPDATE são
+    # os campos enviados
+    def __init__(self, modelo):
+        tabela = modelo.__table__
+        id = bindparam("id_registro")
+        self.por_id = select(modelo).where(modelo.id == id)
+        # O LIMIT é aplicado a cada uso (vira TOP no SQL Server)
+        self.primeira_pagina = select(modelo).order_by(modelo.id)
+        self.pagina_seguinte = (
+            select(modelo).where(modelo.id > bindparam("after_id")).order_by(modelo.id)
+        )
+        self.registro = select(tabela).where(tabela.c.id == id)
+        self.inserir = insert(tabela).returning(*tabela.columns)
+        self.inserir_lote = insert(tabela).returning(
+            *tabela.columns, sort_by_parameter_order=True
+        )
+        self.atualizar = (
+            update(tabela).where(tabela.c.id == id).returning(*tabela.columns)
+        )
+        # A imagem anterior da linha para a auditoria: no SQL Server vem no
+        # OUTPUT do próprio UPDATE (deleted.*)
+        self.atualizar_com_anterior = self.atualizar.returning(
+            *(
+                literal_column(f"deleted.{coluna.name}", coluna.type).label(
+                    f"anterior_{coluna.name}"
+                )
+                for coluna in tabela.columns
+            )
+        )
+        self.excluir = (
+            delete(tabela).where(tabela.c.id == id).returning(*tabela.columns)
+        )
+
+
+@functools.cache
+def comandos(modelo):
+    return Comandos(modelo)
+
+
+@functools.lru_cache(maxsize=256)
+def consulta_por_id(modelo, expand):
+    # Uma variação do comando para cada combinação de relacionamentos pedida
+    return comandos(modelo).por_id.options(*opcoes_expand(modelo, expand))
+
+
+def listar_pagina(db, modelo, listagem):
+    # Só a listagem sem filtros, ordenação, campos nem expand usa os comandos
+    # prontos; as demais combinações são montadas por paginar
+    if listagem.filtros or listagem.sort or listagem.fields or listagem.expand:
+        return paginar(db.query(modelo), modelo, listagem)
+    if listagem.after_id is None:
+        comando = comandos(modelo).primeira_pagina.limit(listagem.limit + 1)
+    else:
+        comando = comandos(modelo).pagina_seguinte.limit(listagem.limit + 1)
+    itens = db.scalars(comando, {"after_id": listagem.after_id}).all()
+    return montar_pagina(itens, listagem.limit)
+
+
+# Busca textual (/search): recursos pesquisados, o campo de cada um no
+# resultado e as colunas do índice de texto criado pela migração 0004 (FTS5 no
+# SQLite, full-text no SQL Server), que o próprio banco mantém atualizado
+BUSCA = {
+    "clientes": (Cliente, "cliente", ("nome", "cpf", "rg")),
+    "medicos": (Medico, "medico", ("nome", "crm", "especialidade")),
+}
+
+
+class ResultadoBusca(BaseModel):
+    tipo: str
+    relevancia: float
+    cliente: Optional[ClienteResponse] = None
+    medico: Optional[MedicoResponse] = None
+
+
+def expressao_busca(dialeto, termos):
+    # Todos os termos, cada um como prefixo: "joa sil" encontra "João da Silva"
+    if dialeto == "mssql":
+        return " AND ".join(f'"{termo}*"' for termo in termos)
+    return " ".join(f'"{termo}"*' for termo in termos)
+
+
+def buscar(db, modelo, colunas, termos, quantidade):
+    # As "quantidade" linhas mais relevantes (maior relevância primeiro): o
+    # índice limita e ordena os resultados antes do JOIN com a tabela
+    dialeto = db.get_bind().dialect.name
+    expressao = expressao_busca(dialeto, termos)
+    if dialeto == "mssql":
+        indice = func.containstable(
+            literal_column(modelo.__tablename__),
+            literal_column(f"({', '.join(colunas)})"),
+            expressao,
+            literal_column(str(int(quantidade))),
+        ).table_valued("KEY", "RANK")
+        chave, relevancia = indice.c.KEY, indice.c.RANK
+    else:
+        fts = table(f"{modelo.__tablename__}_BUSCA", column("rowid"), column("rank"))
+        indice = (
+            select(fts.c.rowid.label("chave"), (-fts.c.rank).label("relevancia"))
+            .where(literal_column(f'"{fts.name}"').op("MATCH")(expressao))
+            .order_by(fts.c.rank)
+            .limit(quantidade)
+            .subquery()
+        )
+        chave, relevancia = indice.c.chave, indice.c.relevancia
+    linhas = (
+        db.query(modelo, relevancia)
+        .join(indice, chave == modelo.id)
+        .order_by(relevancia.desc(), modelo.id)
+        .all()
     )
-    endereco_unidade.unidade_id = endereco_unidade_request.unidade_id
-    endereco_unidade.rua = endereco_unidade_request.rua
-    endereco_unidade.numero = endereco_unidade_request.numero
-    endereco_unidade.cep = endereco_unidade_request.cep
-    endereco_unidade.cidade_id = endereco_unidade_request.cidade_id
-    db.commit()
-    db.refresh(endereco_unidade)
-    return endereco_unidade
-
-
-@app.delete("/enderecos_unidade/{endereco_unidade_id}")
-def delete_endereco_unidade(endereco_unidade_id: int, db=Depends(get_db)):
-    endereco_unidade = (
-        db.query(EnderecoUnidade)
-        .filter(EnderecoUnidade.id == endereco_unidade_id)
-        .first()
+    # Cada índice tem a sua escala (BM25 sobre as estatísticas da própria tabela
+    # no FTS5, RANK de 0 a 1000 no SQL Server): a relevância vira uma fração da
+    # do melhor resultado do recurso, que fica com 1
+    maximo = linhas[0][1] if linhas else 0
+    return [
+        (registro, relevancia / maximo if maximo > 0 else 1.0)
+        for registro, relevancia in linhas
+    ]
+
+
+def formatar_ndjson(lote):
+    return "".join(
+        json.dumps(dict(linha._mapping), default=str, ensure_ascii=False) + "\n"
+        for linha in lote
     )
-    db.delete(endereco_unidade)
-    db.commit()
-    return {"message": "Endereco da unidade deletado com sucesso"}
-
-
-@app.get("/medicos/")
-def get_medicos(db=Depends(get_db)):
-    medicos = db.query(Medico).all()
-    return medicos
-
 
-@app.get("/medicos/{medico_id}")
-def get_medico(medico_id: int, db=Depends(get_db)):
-    medico = db.query(Medico).filter(Medico.id == medico_id).first()
-    return medico
 
-
-@app.post("/medicos/")
-def create_medico(medico: MedicoRequest, db=Depends(get_db)):
-    novo_medico = Medico(
-        nome=medico.nome,
-        telefone=medico.telefone,
-        email=medico.email,
-        especialidade=medico.especialidade,
-        crm=medico.crm,
-    )
-    db.add(novo_medico)
-    db.commit()
-    db.refresh(novo_medico)
-    return novo_medico
-
-
-@app.put("/medicos/{medico_id}")
-def update_medico(medico_id: int, medico_request: MedicoRequest, db=Depends(get_db)):
-    medico = db.query(Medico).filter(Medico.id == medico_id).first()
-    medico.nome = medico_request.nome
-    medico.telefone = medico_request.telefone
-    medico.email = medico_request.email
-    medico.especialidade = medico_request.especialidade
-    medico.crm = medico_request.crm
-    db.commit()
-    db.refresh(medico)
-    return medico
+def linhas_ndjson(modelo):
+    # Sessão própria: o gerador continua rodando depois que a rota retorna
+    db = banco.sessao()
+    try:
+        resultado = db.execute(
+            select(modelo.__table__).order_by(modelo.id),
+            execution_options={"yield_per": EXPORTACAO_LOTE},
+        )
+        for lote in resultado.partitions():
+            yield formatar_ndjson(lote)
+    finally:
+        db.close()
 
 
-@app.delete("/medicos/{medico_id}")
-def delete_medico(medico_id: int, db=Depends(get_db)):
-    medico = db.query(Medico).filter(Medico.id == medico_id).first()
-    db.delete(medico)
+async def linhas_ndjson_async(modelo):
+    async with banco.sessao_async() as db:
+        resultado = await db.stream(
+            select(modelo.__table__).order_by(modelo.id),
+            execution_options={"yield_per": EXPORTACAO_LOTE},
+        )
+        async for lote in resultado.partitions():
+            yield formatar_ndjson(lote)
+
+
+def exportar(modelo):
+    def exportar_tabela(
+        formato: str = Query("ndjson", alias="format", pattern="^ndjson$")
+    ):
+        linhas = linhas_ndjson_async(modelo) if DB_ASYNC else linhas_ndjson(modelo)
+        return StreamingResponse(linhas, media_type="application/x-ndjson")
+
+    return exportar_tabela
+
+
+def validar_lote(schema, itens, com_id=False):
+    validos, erros = [], []
+    for indice, item in enumerate(itens):
+        if com_id and type(item.get("id")) is not int:
+            erros.append({"indice": indice, "erro": "Campo 'id' inteiro obrigatório"})
+            continue
+        try:
+            valores = schema.model_validate(item).model_dump()
+        except ValidationError as e:
+            erros.append(
+                {
+                    "indice": indice,
+                    "erro": e.errors(include_url=False, include_context=False),
+                }
+            )
+            continue
+        if com_id:
+            valores["id"] = item["id"]
+        validos.append((indice, valores))
+    return validos, erros
+
+
+def ids_existentes(db, modelo, ids):
+    existentes = set()
+    for inicio in range(0, len(ids), LOTE_IDS):
+        existentes.update(
+            db.scalars(
+                select(modelo.id).where(modelo.id.in_(ids[inicio : inicio + LOTE_IDS]))
+            )
+        )
+    return existentes
+
+
+def registros_existentes(db, modelo, ids):
+    tabela = modelo.__table__
+    registros = {}
+    for inicio in range(0, len(ids), LOTE_IDS):
+        linhas = db.execute(
+            select(tabela).where(tabela.c.id.in_(ids[inicio : inicio + LOTE_IDS]))
+        ).mappings()
+        registros.update((linha["id"], dict(linha)) for linha in linhas)
+    return registros
+
+
+def executar_lote(db, itens, em_lote, por_item):
+    # Tenta o lote inteiro de uma vez; se alguma linha for rejeitada pelo banco,
+    # repete item a item em savepoints para apontar quais falharam
+    try:
+        with db.begin_nested():
+            resultados = em_lote(itens)
+    except SQLAlchemyError:
+        resultados = []
+        for indice, valores in itens:
+            try:
+                with db.begin_nested():
+                    resultados.append(por_item(indice, valores))
+            except SQLAlchemyError as e:
+                resultados.append(
+                    {"indice": indice, "erro": str(getattr(e, "orig", e))}
+                )
     db.commit()
-    return {"message": "Medico deletado com sucesso"}
-
-
-@app.get("/medicos_unidade/")
-def get_medicos_unidade(db=Depends(get_db)):
-    medicos_unidade = db.query(MedicoUnidade).all()
-    return medicos_unidade
-
-
-@app.get("/medicos_unidade/{medico_unidade_id}")
-def get_medico_unidade(medico_unidade_id: int, db=Depends(get_db)):
-    medico_unidade = (
-        db.query(MedicoUnidade).filter(MedicoUnidade.id == medico_unidade_id).first()
-    )
-    return medico_unidade
-
-
-@app.post("/medicos_unidade/")
-def create_medico_unidade(medico_unidade: MedicoUnidadeRequest, db=Depends(get_db)):
-    novo_medico_unidade = MedicoUnidade(
-        medico_id=medico_unidade.medico_id,
-        unidade_id=medico_unidade.unidade_id,
-        horario_atendimento=medico_unidade.horario_atendimento,
-    )
-    db.add(novo_medico_unidade)
+    return resultados
+
+
+def relatorio_lote(resultados):
+    resultados.sort(key=lambda resultado: resultado["indice"])
+    falhas = sum(1 for resultado in resultados if "erro" in resultado)
+    return {
+        "resultados": resultados,
+        "sucessos": len(resultados) - falhas,
+        "falhas": falhas,
+    }
+
+
+def criar_lote(modelo, schema):
+    def create_bulk(
+        itens: List[Dict[str, Any]] = Body(max_length=BULK_MAXIMO),
+        db=Depends(get_db),
+    ):
+        validos, erros = validar_lote(schema, itens)
+
+        def em_lote(itens):
+            linhas = db.execute(
+                comandos(modelo).inserir_lote, [valores for _, valores in itens]
+            ).mappings()
+            resultados = []
+            for (indice, _), linha in zip(itens, linhas):
+                auditar(db, modelo.__tablename__, None, dict(linha))
+                resultados.append({"indice": indice, "id": linha["id"]})
+            return resultados
+
+        def por_item(indice, valores):
+            linha = db.execute(comandos(modelo).inserir, valores).mappings().one()
+            auditar(db, modelo.__tablename__, None, dict(linha))
+            return {"indice": indice, "id": linha["id"]}
+
+        resultados = executar_lote(db, validos, em_lote, por_item) if validos else []
+        return relatorio_lote(resultados + erros)
+
+    return create_bulk
+
+
+def atualizar_lote(modelo, schema):
+    def update_bulk(
+        itens: List[Dict[str, Any]] = Body(max_length=BULK_MAXIMO),
+        db=Depends(get_db),
+    ):
+        validos, erros = validar_lote(schema, itens, com_id=True)
+        ids = [v["id"] for _, v in validos]
+        # Com a auditoria, as linhas atuais são lidas inteiras (imagem anterior)
+        if AUDITORIA:
+            anteriores = registros_existentes(db, modelo, ids)
+        else:
+            anteriores = dict.fromkeys(ids_existentes(db, modelo, ids))
+        for indice, valores in validos:
+            if valores["id"] not in anteriores:
+                erros.append({"indice": indice, "erro": "Registro não encontrado"})
+        validos = [(i, v) for i, v in validos if v["id"] in anteriores]
+
+        def auditar_item(valores):
+            antes = anteriores[valores["id"]]
+            if antes is not None:
+                auditar(db, modelo.__tablename__, antes, {**antes, **valores})
+
+        def em_lote(itens):
+            # UPDATE por chave primária executado como executemany
+            db.execute(update(modelo), [valores for _, valores in itens])
+            for _, valores in itens:
+                auditar_item(valores)
+            return [{"indice": indice, "id": v["id"]} for indice, v in itens]
+
+        def por_item(indice, valores):
+            db.execute(
+                update(modelo).where(modelo.id == valores["id"]).values(**valores)
+            )
+            auditar_item(valores)
+            return {"indice": indice, "id": valores["id"]}
+
+        resultados = executar_lote(db, validos, em_lote, por_item) if validos else []
+        return relatorio_lote(resultados + erros)
+
+    return update_bulk
+
+
+def deletar_lote(modelo):
+    def delete_bulk(
+        ids: List[int] = Body(max_length=BULK_MAXIMO), db=Depends(get_db)
+    ):
+        existentes = ids_existentes(db, modelo, ids)
+        validos = [(i, id) for i, id in enumerate(ids) if id in existentes]
+        erros = [
+            {"indice": i, "erro": "Registro não encontrado"}
+            for i, id in enumerate(ids)
+            if id not in existentes
+        ]
+
+        def em_lote(itens):
+            # O RETURNING (OUTPUT no SQL Server) devolve as linhas excluídas
+            # para a auditoria
+            ids_validos = [id for _, id in itens]
+            for inicio in range(0, len(ids_validos), LOTE_IDS):
+                ids_lote = ids_validos[inicio : inicio + LOTE_IDS]
+                auditar_cascata(db, modelo.__table__, ids_lote)
+                linhas = db.execute(
+                    delete(modelo)
+                    .where(modelo.id.in_(ids_lote))
+                    .returning(*modelo.__table__.columns)
+                    .execution_options(synchronize_session=False)
+                ).mappings()
+                for linha in linhas:
+                    auditar(db, modelo.__tablename__, dict(linha), None)
+            return [{"indice": indice, "id": id} for indice, id in itens]
+
+        def por_item(indice, id):
+            auditar_cascata(db, modelo.__table__, [id])
+            resultado = db.execute(comandos(modelo).excluir, {"id_registro": id})
+            for linha in resultado.mappings():
+                auditar(db, modelo.__tablename__, dict(linha), None)
+            return {"indice": indice, "id": id}
+
+        resultados = executar_lote(db, validos, em_lote, por_item) if validos else []
+        return relatorio_lote(resultados + erros)
+
+    return delete_bulk
+
+
+def inserir_registro(db, modelo, valores):
+    # INSERT ... RETURNING (OUTPUT no SQL Server) com todas as colunas, sem o
+    # SELECT do refresh depois do commit
+    registro = dict(db.execute(comandos(modelo).inserir, valores).mappings().one())
+    auditar(db, modelo.__tablename__, None, registro)
     db.commit()
-    db.refresh(novo_medico_unidade)
-    return novo_medico_unidade
-
-
-@app.put("/medicos_unidade/{medico_unidade_id}")
-def update_medico_unidade(
-    medico_unidade_id: int, medico_unidade_request: MedicoUnidadeRequest, db=Depends(get_db)
-):
-    medico_unidade = (
-        db.query(MedicoUnidade).filter(MedicoUnidade.id == medico_unidade_id).first()
-    )
-    medico_unidade.medico_id = medico_unidade_request.medico_id
-    medico_unidade.unidade_id = medico_unidade_request.unidade_id
-    medico_unidade.horario_atendimento = medico_unidade_request.horario_atendimento
+    return registro
+
+
+def atualizar_com_anterior(db, modelo, parametros):
+    # UPDATE que devolve as imagens anterior e nova da linha, para a auditoria.
+    # O OUTPUT do SQL Server traz as duas no mesmo comando; o RETURNING do
+    # SQLite só tem os valores novos e a linha é lida antes, na mesma transação
+    c = comandos(modelo)
+    if db.get_bind().dialect.name == "mssql":
+        linha = db.execute(c.atualizar_com_anterior, parametros).mappings().first()
+        if linha is None:
+            return None, None
+        colunas = modelo.__table__.columns.keys()
+        antes = {coluna: linha[f"anterior_{coluna}"] for coluna in colunas}
+        return antes, {coluna: linha[coluna] for coluna in colunas}
+    antes = db.execute(c.registro, parametros).mappings().first()
+    if antes is None:
+        return None, None
+    return dict(antes), dict(db.execute(c.atualizar, parametros).mappings().one())
+
+
+def atualizar_registro(db, modelo, id, valores):
+    # Um único UPDATE ... RETURNING (OUTPUT no SQL Server) pela chave primária,
+    # sem o SELECT do refresh (nem o de antes da alteração, exceto para a
+    # auditoria no SQLite); nenhuma linha devolvida significa que o registro
+    # não existe
+    parametros = {**valores, "id_registro": id}
+    antes = None
+    if valores and AUDITORIA:
+        antes, registro = atualizar_com_anterior(db, modelo, parametros)
+    else:
+        if valores:
+            comando = comandos(modelo).atualizar
+        else:
+            comando = comandos(modelo).registro
+        registro = db.execute(comando, parametros).mappings().first()
+    if registro is None:
+        raise HTTPException(status_code=404, detail="Registro não encontrado")
+    if antes is not None:
+        auditar(db, modelo.__tablename__, antes, registro)
     db.commit()
-    db.refresh(medico_unidade)
-    return medico_unidade
-
-
-@app.delete("/medicos_unidade/{medico_unidade_id}")
-def delete_medico_unidade(medico_unidade_id: int, db=Depends(get_db)):
-    medico_unidade = (
-        db.query(MedicoUnidade).filter(MedicoUnidade.id == medico_unidade_id).first()
-    )
-    db.delete(medico_unidade)
+    return dict(registro)
+
+
+def excluir_registro(db, modelo, id):
+    # DELETE direto pela chave primária: as linhas dependentes saem pelo ON
+    # DELETE CASCADE do banco. O RETURNING (OUTPUT no SQL Server) devolve a
+    # linha excluída para a auditoria; as dependentes são lidas antes
+    auditar_cascata(db, modelo.__table__, [id])
+    resultado = db.execute(comandos(modelo).excluir, {"id_registro": id})
+    registro = resultado.mappings().first()
+    if registro is None:
+        raise HTTPException(status_code=404, detail="Registro não encontrado")
+    auditar(db, modelo.__tablename__, dict(registro), None)
     db.commit()
-    return {"message": "Medico da unidade deletado com sucesso"}
-
-
-@app.get("/estados_civis/")
-def get_estados_civis(db=Depends(get_db)):
-    estados_civis = db.query(EstadoCivil).all()
-    return estados_civis
 
 
-@app.get("/estados_civis/{estado_civil_id}")
-def get_estado_civil(estado_civil_id: int, db=Depends(get_db)):
-    estado_civil = (
-        db.query(EstadoCivil).filter(EstadoCivil.id == estado_civil_id).first()
+def comando_merge(tabela, colunas):
+    # HOLDLOCK mantém o bloqueio da chave procurada até o fim do MERGE, senão
+    # dois MERGE concorrentes podem não encontrar a linha e ambos inserirem. O
+    # OUTPUT traz também a linha anterior (deleted.*, nula numa inserção), usada
+    # pela auditoria
+    atribuicoes = ", ".join(f"{coluna} = :{coluna}" for coluna in colunas)
+    saida = [f"inserted.{coluna.name}" for coluna in tabela.columns] + [
+        f"deleted.{coluna.name} AS anterior_{coluna.name}" for coluna in tabela.columns
+    ]
+    return text(
+        f"MERGE {tabela.name} WITH (HOLDLOCK) AS destino "
+        f"USING (SELECT id FROM {Cliente.__tablename__} WHERE id = :cliente_id) "
+        "AS origem ON destino.cliente_id = origem.id "
+        f"WHEN MATCHED THEN UPDATE SET {atribuicoes} "
+        f"WHEN NOT MATCHED THEN INSERT (cliente_id, {', '.join(colunas)}) "
+        f"VALUES (origem.id, {', '.join(f':{coluna}' for coluna in colunas)}) "
+        f"OUTPUT {', '.join(saida)};"
+    ).columns(
+        *tabela.columns,
+        *(column(f"anterior_{coluna.name}", coluna.type) for coluna in tabela.columns),
     )
-    return estado_civil
 
 
-@app.post("/estados_civis/")
-def create_estado_civil(estado_civil: EstadoCivilRequest, db=Depends(get_db)):
-    novo_estado_civil = EstadoCivil(nome=estado_civil.nome)
-    db.add(novo_estado_civil)
+def gravar_do_cliente(db, modelo, cliente_id, valores):
+    # Cria ou atualiza, num único comando atômico, o registro de uma tabela com
+    # cliente_id UNIQUE: MERGE no SQL Server e INSERT ... ON CONFLICT no SQLite.
+    # A origem das linhas é o próprio cliente, então um cliente inexistente não
+    # grava nada e não devolve linha
+    tabela = modelo.__table__
+    if db.get_bind().dialect.name == "mssql":
+        comando = comando_merge(tabela, list(valores))
+        # Comando textual: não passa pelo registro de INSERT/UPDATE da sessão
+        db.info.setdefault("tabelas_alteradas", set()).add(tabela.name)
+        resultado = db.execute(comando, {**valores, "cliente_id": cliente_id})
+        linha = resultado.mappings().first()
+        if linha is None:
+            raise HTTPException(status_code=404, detail="Cliente não encontrado")
+        registro = {coluna: linha[coluna] for coluna in tabela.columns.keys()}
+        antes = {coluna: linha[f"anterior_{coluna}"] for coluna in registro}
+        if antes["id"] is None:
+            antes = None
+    else:
+        # O RETURNING do SQLite só tem os valores novos: a linha anterior é lida
+        # antes, na mesma transação
+        antes = None
+        if AUDITORIA:
+            anterior = db.execute(
+                select(tabela).where(tabela.c.cliente_id == cliente_id)
+            ).mappings().first()
+            antes = dict(anterior) if anterior else None
+        origem = select(
+            Cliente.id,
+            *(literal(valor, tabela.c[nome].type) for nome, valor in valores.items()),
+        ).where(Cliente.id == cliente_id)
+        insercao = sqlite_insert(modelo).from_select(["cliente_id", *valores], origem)
+        registro = db.execute(
+            insercao.on_conflict_do_update(
+                index_elements=[tabela.c.cliente_id],
+                set_={nome: insercao.excluded[nome] for nome in valores},
+            ).returning(*tabela.columns)
+        ).mappings().first()
+        if registro is None:
+            raise HTTPException(status_code=404, detail="Cliente não encontrado")
+        registro = dict(registro)
+    auditar(db, tabela.name, antes, registro)
     db.commit()
-    db.refresh(novo_estado_civil)
-    return novo_estado_civil
+    return registro
 
 
-@app.put("/estados_civis/{estado_civil_id}")
-def update_estado_civil(
-    estado_civil_id: int, estado_civil_request: EstadoCivilRequest, db=Depends(get_db)
-):
-    estado_civil = (
-        db.query(EstadoCivil).filter(EstadoCivil.id == estado_civil_id).first()
-    )
-    estado_civil.nome = estado_civil_request.nome
+def gravar_grupo(db, modelo, itens):
+    # Insere o grupo inteiro num único INSERT ... RETURNING e confirma uma vez;
+    # se o banco rejeitar alguma linha, repete item a item em savepoints. Cada
+    # item recebe a linha gravada ou a exceção que o rejeitou
+    try:
+        with db.begin_nested():
+            linhas = db.execute(comandos(modelo).inserir_lote, itens).mappings()
+            resultados = [dict(linha) for linha in linhas]
+    except SQLAlchemyError:
+        resultados = []
+        for valores in itens:
+            try:
+                with db.begin_nested():
+                    linha = db.execute(comandos(modelo).inserir, valores).mappings()
+                    resultados.append(dict(linha.one()))
+            except SQLAlchemyError as erro:
+                resultados.append(erro)
+    for resultado in resultados:
+        if not isinstance(resultado, Exception):
+            auditar(db, modelo.__tablename__, None, resultado)
     db.commit()
-    db.refresh(estado_civil)
-    return estado_civil
-
-
-@app.delete("/estados_civis/{estado_civil_id}")
-def delete_estado_civil(estado_civil_id: int, db=Depends(get_db)):
-    estado_civil = (
-        db.query(EstadoCivil).filter(EstadoCivil.id == estado_civil_id).first()
+    return resultados
+
+
+def entregar(lote, resultados):
+    for (_, futuro), resultado in zip(lote, resultados):
+        # Quem chamou pode ter desistido de esperar (timeout, requisição
+        # cancelada): o futuro já está concluído e não recebe mais resultado
+        if futuro.done():
+            continue
+        if isinstance(resultado, Exception):
+            futuro.set_exception(resultado)
+        else:
+            futuro.set_result(resultado)
+
+
+class FilaLotes(ABC):
+    # Fila gravada em lotes por um único trabalhador: uma thread com a sessão
+    # síncrona ou, com DB_ASYNC, uma tarefa no event loop com a AsyncSession.
+    # Cada lote tem até "maximo" itens e espera no máximo "espera_ms" pelos
+    # seguintes; com "tamanho", a fila é limitada e quem coloca um item espera
+    # enquanto ela estiver cheia. Um lote que falha é gravado de novo até
+    # "tentativas" vezes antes de ir para concluir com a exceção
+    def __init__(self, nome, maximo, espera_ms, tamanho=0, tentativas=1):
+        self.nome = nome
+        self.maximo = maximo
+        self.espera = espera_ms / 1000
+        self.tamanho = tamanho
+        self.tentativas = tentativas
+        self.fila = None
+        self.trabalhador = None
+
+    def iniciar(self):
+        if DB_ASYNC:
+            self.fila = asyncio.Queue(self.tamanho)
+            self.trabalhador = asyncio.create_task(self.executar_async())
+        else:
+            self.fila = queue.Queue(self.tamanho)
+            self.trabalhador = threading.Thread(target=self.executar, name=self.nome)
+            self.trabalhador.start()
+
+    async def encerrar(self):
+        # O marcador None faz o trabalhador gravar o que resta na fila e parar
+        if DB_ASYNC:
+            await self.fila.put(None)
+            await self.trabalhador
+        else:
+            await run_in_threadpool(self.fila.put, None)
+            await run_in_threadpool(self.trabalhador.join)
+
+    def colocar(self, item):
+        # Chamado na thread do threadpool ou, com DB_ASYNC, dentro do run_sync da
+        # AsyncSession, onde await_only espera sem bloquear o loop
+        if not DB_ASYNC:
+            self.fila.put(item)
+        elif self.fila.full():
+            await_only(self.fila.put(item))
+        else:
+            self.fila.put_nowait(item)
+
+    @abstractmethod
+    def gravar_lote(self, db, itens):
+        pass
+
+    def intervalo(self, tentativa):
+        # Espera antes de repetir um lote: 0,1 s, 0,2 s, 0,4 s...
+        return 0.1 * 2 ** (tentativa - 1)
+
+    def concluir(self, itens, resultados):
+        # resultados: o retorno de gravar_lote ou a exceção que o interrompeu
+        pass
+
+    def finalizar(self, itens, resultados):
+        # Um erro ao concluir um lote não pode parar o trabalhador
+        try:
+            self.concluir(itens, resultados)
+        except Exception:
+            logger.exception(
+                "%s: falha ao concluir um lote de %d itens", self.nome, len(itens)
+            )
+
+    def executar(self):
+        while True:
+            lote = [self.fila.get()]
+            limite = time.monotonic() + self.espera
+            while lote[-1] is not None and len(lote) < self.maximo:
+                try:
+                    lote.append(
+                        self.fila.get(timeout=max(limite - time.monotonic(), 0))
+                    )
+                except queue.Empty:
+                    break
+            itens = [item for item in lote if item is not None]
+            if itens:
+                for tentativa in range(self.tentativas):
+                    if tentativa:
+                        time.sleep(self.intervalo(tentativa))
+                    try:
+                        with banco.sessao() as db:
+                            resultados = self.gravar_lote(db, itens)
+                        break
+                    except Exception as erro:
+                        resultados = erro
+                self.finalizar(itens, resultados)
+            if lote[-1] is None:
+                return
+
+    async def executar_async(self):
+        laco = asyncio.get_running_loop()
+        while True:
+            lote = [await self.fila.get()]
+            limite = laco.time() + self.espera
+            while lote[-1] is not None and len(lote) < self.maximo:
+                if not self.fila.empty():
+                    lote.append(self.fila.get_nowait())
+                    continue
+                try:
+                    lote.append(
+                        await asyncio.wait_for(self.fila.get(), limite - laco.time())
+                    )
+                except asyncio.TimeoutError:
+                    break
+            itens = [item for item in lote if item is not None]
+            if itens:
+                for tentativa in range(self.tentativas):
+                    if tentativa:
+                        await asyncio.sleep(self.intervalo(tentativa))
+                    try:
+                        async with banco.sessao_async() as db:
+                            resultados = await db.run_sync(self.gravar_lote, itens)
+                        break
+                    except Exception as erro:
+                        resultados = erro
+                self.finalizar(itens, resultados)
+            if lote[-1] is None:
+                return
+
+
+class GrupoCommit(FilaLotes):
+    # Inserções de um modelo em group commit: quem chama espera pela própria
+    # linha (ou exceção)
+    def __init__(self, modelo):
+        super().__init__(
+            f"grupo-{modelo.__tablename__}", GRUPO_MAXIMO, GRUPO_ESPERA_MS
+        )
+        self.modelo = modelo
+
+    def gravar(self, valores):
+        # Sem resposta em GRUPO_TIMEOUT a requisição recebe 503 e o futuro é
+        # cancelado: o item só é gravado se já estiver num lote em andamento
+        if DB_ASYNC:
+            futuro = asyncio.get_running_loop().create_future()
+            self.colocar((valores, futuro))
+            try:
+                return await_only(asyncio.wait_for(futuro, GRUPO_TIMEOUT))
+            except asyncio.TimeoutError:
+                raise self.tempo_esgotado()
+        futuro = concurrent.futures.Future()
+        self.colocar((valores, futuro))
+        try:
+            return futuro.result(timeout=GRUPO_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            futuro.cancel()
+            raise self.tempo_esgotado()
+
+    def tempo_esgotado(self):
+        logger.error("%s: item sem resposta em %s s", self.nome, GRUPO_TIMEOUT)
+        return HTTPException(
+            status_code=503, detail="Tempo esgotado aguardando a gravação"
+        )
+
+    def gravar_lote(self, db, itens):
+        # Os itens de quem já desistiu de esperar ficam fora do INSERT; o
+        # resultado deles (None) é descartado por entregar
+        ativos = [not futuro.done() for _, futuro in itens]
+        if not any(ativos):
+            return [None] * len(itens)
+        gravados = iter(
+            gravar_grupo(
+                db,
+                self.modelo,
+                [valores for (valores, _), ativo in zip(itens, ativos) if ativo],
+            )
+        )
+        return [next(gravados) if ativo else None for ativo in ativos]
+
+    def concluir(self, itens, resultados):
+        if isinstance(resultados, Exception):
+            resultados = [resultados] * len(itens)
+        entregar(itens, resultados)
+
+
+class GravadorAuditoria(FilaLotes):
+    # Grava os registros de auditoria confirmados com um INSERT executemany por
+    # lote. Um lote rejeitado em todas as tentativas é registrado no log e
+    # seus registros contados em falhas
+    def __init__(self):
+        super().__init__(
+            "auditoria",
+            AUDITORIA_LOTE,
+            AUDITORIA_ESPERA_MS,
+            AUDITORIA_BUFFER,
+            AUDITORIA_TENTATIVAS,
+        )
+        self.gravados = 0
+        self.falhas = 0
+
+    def gravar_lote(self, db, itens):
+        db.execute(insert(Auditoria), linhas_auditoria(itens))
+        db.commit()
+
+    def concluir(self, itens, resultados):
+        if isinstance(resultados, Exception):
+            self.falhas += len(itens)
+            logger.error(
+                "Lote de %d registros de auditoria descartado após %d tentativas",
+                len(itens),
+                self.tentativas,
+                exc_info=resultados,
+            )
+        else:
+            self.gravados += len(itens)
+
+    def pendentes(self):
+        return self.fila.qsize() if self.fila is not None else 0
+
+
+auditoria = GravadorAuditoria()
+
+GRUPOS = {
+    modelo: GrupoCommit(modelo)
+    for modelo in (HistoricoSaudeCliente, HistoricoHospitalCliente)
+}
+
+
+def esquema_parcial(schema):
+    # Os mesmos campos e tipos do schema, todos opcionais: só os enviados vão
+    # para o UPDATE e null continua inválido nos campos obrigatórios
+    return create_model(
+        f"{schema.__name__}Parcial",
+        **{
+            nome: (campo.annotation, None)
+            for nome, campo in schema.model_fields.items()
+        },
     )
-    db.delete(estado_civil)
-    db.commit()
-    return {"message": "Estado civil deletado com sucesso"}
 
 
-@app.get("/clientes/")
-def get_clientes(db=Depends(get_db)):
-    clientes = db.query(Cliente).all()
-    return clientes
+class Recurso:
+    # Um recurso da API: prefixo das rotas, modelo, schemas da requisição e da
+    # resposta, mensagem do DELETE e se a listagem é servida pelo cache. As
+    # rotas CRUD, de exportação e de lote são geradas a partir daqui
+    def __init__(self, prefixo, modelo, schema, resposta, mensagem, cache=False):
+        self.prefixo = prefixo
+        self.modelo = modelo
+        self.schema = schema
+        self.resposta = resposta
+        self.mensagem = mensagem
+        self.cache = cache
+        # CP1_ESTADO_CIVIL -> estado_civil (nome das rotas e do parâmetro do id)
+        self.nome = modelo.__tablename__.removeprefix("CP1_").lower()
+
+
+def registrar_crud(recurso):
+    modelo, schema, nome = recurso.modelo, recurso.schema, recurso.nome
+    colecao = f"/{recurso.prefixo}/"
+    caminho = f"/{recurso.prefixo}/{{{nome}_id}}"
+    Id = Annotated[int, Path(alias=f"{nome}_id")]
+    parcial = esquema_parcial(schema)
+
+    def listar(listagem: ParametrosListagem, db=Depends(get_db)):
+        return listar_pagina(db, modelo, listagem)
+
+    def obter(id: Id, expand: Expand = None, db=Depends(get_db)):
+        consulta = consulta_por_id(modelo, expand)
+        return db.scalars(consulta, {"id_registro": id}).unique().first()
+
+    def criar(dados: schema, db=Depends(get_db)):
+        if GRUPO_COMMIT and modelo in GRUPOS:
+            return GRUPOS[modelo].gravar(dados.model_dump())
+        return inserir_registro(db, modelo, dados.model_dump())
+
+    def atualizar(id: Id, dados: schema, db=Depends(get_db)):
+        return atualizar_registro(db, modelo, id, dados.model_dump())
+
+    def atualizar_parcial(id: Id, dados: parcial, db=Depends(get_db)):
+        return atualizar_registro(db, modelo, id, dados.model_dump(exclude_unset=True))
+
+    def excluir(id: Id, db=Depends(get_db)):
+        excluir_registro(db, modelo, id)
+        return {"message": recurso.mensagem}
+
+    # O nome da função também compõe a chave do cache
+    listar.__name__ = f"get_{recurso.prefixo}"
+    if recurso.cache:
+        listar = em_cache(modelo)(listar)
+    resposta = recurso.resposta
+    app.get(colecao, response_model=Pagina[resposta], name=listar.__name__)(listar)
+    app.get(caminho, response_model=Optional[resposta], name=f"get_{nome}")(obter)
+    app.post(colecao, response_model=resposta, name=f"create_{nome}")(criar)
+    app.put(caminho, response_model=resposta, name=f"update_{nome}")(atualizar)
+    app.patch(caminho, response_model=resposta, name=f"patch_{nome}")(atualizar_parcial)
+    app.delete(caminho, response_model=Mensagem, name=f"delete_{nome}")(excluir)
+
+
+# Recursos expostos pela API. As listagens das tabelas de referência, pequenas e
+# raramente alteradas, são servidas pelo cache
+RECURSOS = [
+    Recurso(
+        "estados",
+        Estado,
+        EstadoRequest,
+        EstadoResponse,
+        "Estado deletado com sucesso",
+        cache=True,
+    ),
+    Recurso(
+        "cidades",
+        Cidade,
+        CidadeRequest,
+        CidadeResponse,
+        "Cidade deletada com sucesso",
+    ),
+    Recurso(
+        "empresas",
+        Empresa,
+        EmpresaRequest,
+        EmpresaResponse,
+        "Empresa deletada com sucesso",
+    ),
+    Recurso(
+        "convenios",
+        Convenio,
+        ConvenioRequest,
+        ConvenioResponse,
+        "Convenio deletado com sucesso",
+    ),
+    Recurso(
+        "areas_atuacao",
+        AreaAtuacao,
+        AreaAtuacaoRequest,
+        AreaAtuacaoResponse,
+        "Area de atuacao deletada com sucesso",
+        cache=True,
+    ),
+    Recurso(
+        "unidades",
+        Unidade,
+        UnidadeRequest,
+        UnidadeResponse,
+        "Unidade deletada com sucesso",
+    ),
+    Recurso(
+        "enderecos_unidade",
+        EnderecoUnidade,
+        EnderecoUnidadeRequest,
+        EnderecoUnidadeResponse,
+        "Endereco da unidade deletado com sucesso",
+    ),
+    Recurso(
+        "medicos",
+        Medico,
+        MedicoRequest,
+        MedicoResponse,
+        "Medico deletado com sucesso",
+    ),
+    Recurso(
+        "medicos_unidade",
+        MedicoUnidade,
+        MedicoUnidadeRequest,
+        MedicoUnidadeResponse,
+        "Medico da unidade deletado com sucesso",
+    ),
+    Recurso(
+        "estados_civis",
+        EstadoCivil,
+        EstadoCivilRequest,
+        EstadoCivilResponse,
+        "Estado civil deletado com sucesso",
+        cache=True,
+    ),
+    Recurso(
+        "clientes",
+        Cliente,
+        ClienteRequest,
+        ClienteResponse,
+        "Cliente deletado com sucesso",
+    ),
+    Recurso(
+        "enderecos_cliente",
+        EnderecoCliente,
+        EnderecoClienteRequest,
+        EnderecoClienteResponse,
+        "Endereco do cliente deletado com sucesso",
+    ),
+    Recurso(
+        "comorbidades",
+        Comorbidade,
+        ComorbidadeRequest,
+        ComorbidadeResponse,
+        "Comorbidade deletada com sucesso",
+        cache=True,
+    ),
+    Recurso(
+        "historicos_saude_cliente",
+        HistoricoSaudeCliente,
+        HistoricoSaudeClienteRequest,
+        HistoricoSaudeClienteResponse,
+        "Histórico de saúde do cliente deletado com sucesso",
+    ),
+    Recurso(
+        "historicos_hospital_cliente",
+        HistoricoHospitalCliente,
+        HistoricoHospitalClienteRequest,
+        HistoricoHospitalClienteResponse,
+        "Histórico hospitalar do cliente deletado com sucesso",
+    ),
+]
+
+
+# Cache-Control enviado nas respostas GET de cada recurso. As tabelas de
+# referência podem ser reaproveitadas por alguns minutos; os demais recursos
+# são revalidados a cada uso (If-None-Match) e não ficam em caches compartilhados
+CACHE_CONTROL = {
+    "estados": "public, max-age=300",
+    "cidades": "public, max-age=300",
+    "estados_civis": "public, max-age=300",
+    "comorbidades": "public, max-age=300",
+    "areas_atuacao": "public, max-age=300",
+}
+CACHE_CONTROL_PADRAO = "private, no-cache"
+
+MODELOS_POR_PREFIXO = {recurso.prefixo: recurso.modelo for recurso in RECURSOS}
+
+# Rotas /<prefixo>/{id}/<sub-recurso> que também leem as tabelas de outros
+# recursos: o ETag depende de todas elas e a resposta não é compartilhável
+MODELOS_SUBRECURSO = {
+    ("clientes", "resumo"): (
+        Cliente,
+        EnderecoCliente,
+        HistoricoSaudeCliente,
+        HistoricoHospitalCliente,
+    ),
+    ("cidades", "unidades"): (Unidade, EnderecoUnidade, MedicoUnidade),
+    ("unidades", "medicos"): (MedicoUnidade,),
+}
+
+
+def modelos_da_rota(caminho):
+    partes = caminho.strip("/").split("/")
+    if len(partes) == 3 and (partes[0], partes[2]) in MODELOS_SUBRECURSO:
+        return MODELOS_SUBRECURSO[partes[0], partes[2]], CACHE_CONTROL_PADRAO
+    modelo = MODELOS_POR_PREFIXO.get(partes[0])
+    if modelo is None:
+        return None, None
+    return (modelo,), CACHE_CONTROL.get(partes[0], CACHE_CONTROL_PADRAO)
+
+
+def calcular_etag(modelos, scope):
+    # Derivado das versões das tabelas envolvidas (as mesmas usadas pelo cache),
+    # sem consultar o banco nem serializar a resposta. Com o cache em memória as
+    # versões não veem escritas de outros workers, então o ETag também muda a
+    # cada CACHE_TTL para limitar o tempo em que um 304 pode estar desatualizado
+    expand = QueryParams(scope["query_string"]).get("expand")
+    tabelas = tabelas_lidas(modelos, expand)
+    partes = [scope["path"], scope["query_string"].decode(), cache.versoes(tabelas)]
+    if not cache.compartilhado:
+        partes.append(int(time.time() // CACHE_TTL))
+    return '"' + hashlib.sha1(repr(partes).encode()).hexdigest() + '"'
+
+
+def etag_corresponde(if_none_match, etag):
+    if not if_none_match:
+        return False
+    etags = (valor.strip().removeprefix("W/") for valor in if_none_match.split(","))
+    return etag in etags
+
+
+class ETagMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+        modelos, cache_control = modelos_da_rota(scope["path"])
+        if modelos is None:
+            return await self.app(scope, receive, send)
+
+        etag = calcular_etag(modelos, scope)
+        cabecalhos = {"ETag": etag, "Cache-Control": cache_control}
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        if if_none_match and if_none_match.strip() == "*":
+            return await self.se_existir(scope, receive, send, cabecalhos)
+        if etag_corresponde(if_none_match, etag):
+            return await Response(status_code=304, headers=cabecalhos)(
+                scope, receive, send
+            )
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start" and mensagem["status"] == 200:
+                MutableHeaders(scope=mensagem).update(cabecalhos)
+            await send(mensagem)
+
+        await self.app(scope, receive, enviar)
+
+    async def se_existir(self, scope, receive, send, cabecalhos):
+        # "If-None-Match: *" corresponde a qualquer versão, desde que o recurso
+        # exista: a rota roda e só um 200 com corpo (as buscas por id respondem
+        # null quando o registro não existe) vira 304
+        inicio, corpo = None, []
+
+        async def guardar(mensagem):
+            nonlocal inicio
+            if mensagem["type"] == "http.response.start":
+                inicio = mensagem
+            elif mensagem["type"] == "http.response.body":
+                corpo.append(mensagem.get("body", b""))
+
+        await self.app(scope, receive, guardar)
+        corpo = b"".join(corpo)
+        if inicio["status"] == 200 and corpo != b"null":
+            return await Response(status_code=304, headers=cabecalhos)(
+                scope, receive, send
+            )
+        if inicio["status"] == 200:
+            MutableHeaders(scope=inicio).update(cabecalhos)
+        await send(inicio)
+        await send({"type": "http.response.body", "body": corpo})
+
+
+app.add_middleware(ETagMiddleware)
+# Adicionado por último para ficar por fora e medir também os 304 do ETag
+app.add_middleware(metricas.MetricasMiddleware)
 
 
-@app.get("/clientes/{cliente_id}")
-def get_cliente(cliente_id: int, db=Depends(get_db)):
-    cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
-    return cliente
+# Rotas
+@app.get("/")
+def read_root():
+    return {"message": "Bem-vindo a API da EconoMed"}
 
 
-@app.post("/clientes/")
-def create_cliente(cliente: ClienteRequest, db=Depends(get_db)):
-    novo_cliente = Cliente(
-        rg=cliente.rg,
-        nome=cliente.nome,
-        sexo=cliente.sexo,
-        telefone=cliente.telefone,
-        email=cliente.email,
-        data_nascimento=cliente.data_nascimento,
-        cpf=cliente.cpf,
-        convenio_id=cliente.convenio_id,
-        estado_civil_id=cliente.estado_civil_id,
+# Não consulta o banco, então responde mesmo antes de o pool estar aquecido
+@app.get("/health")
+def get_health():
+    inicializacao = getattr(app.state, "inicializacao", None)
+    return {
+        "status": "ok",
+        "database": banco.estado,
+        "startup_ms": round(inicializacao * 1000, 1) if inicializacao else None,
+    }
+
+
+@app.get("/metrics/pool")
+def get_metrics_pool():
+    pool = banco.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": banco.max_overflow,
+        "wait": espera_pool.resumo(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    pool = get_metrics_pool()
+    linhas = [metricas.exportar()]
+    for nome, valor in (
+        ("db_pool_size", pool["size"]),
+        ("db_pool_checked_out", pool["checked_out"]),
+        ("db_pool_idle", pool["idle"]),
+        ("db_pool_overflow", pool["overflow"]),
+    ):
+        linhas += [f"# TYPE {nome} gauge", f"{nome} {valor}"]
+    linhas += [
+        "# TYPE db_pool_wait_seconds summary",
+        f"db_pool_wait_seconds_sum {pool['wait']['total_ms'] / 1000}",
+        f"db_pool_wait_seconds_count {pool['wait']['count']}",
+    ]
+    inicializacao = getattr(app.state, "inicializacao", None)
+    if inicializacao is not None:
+        linhas += [
+            "# TYPE app_startup_seconds gauge",
+            f"app_startup_seconds {inicializacao}",
+        ]
+    linhas += [
+        "# TYPE auditoria_pendentes gauge",
+        f"auditoria_pendentes {auditoria.pendentes()}",
+        "# TYPE auditoria_gravados_total counter",
+        f"auditoria_gravados_total {auditoria.gravados}",
+        "# TYPE auditoria_falhas_total counter",
+        f"auditoria_falhas_total {auditoria.falhas}",
+    ]
+    return PlainTextResponse(
+        "\n".join(linhas) + "\n", media_type="text/plain; version=0.0.4"
     )
-    db.add(novo_cliente)
-    db.commit()
-    db.refresh(novo_cliente)
-    return novo_cliente
-
-
-@app.put("/clientes/{cliente_id}")
-def update_cliente(cliente_id: int, cliente_request: ClienteRequest, db=Depends(get_db)):
-    cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
-    cliente.rg = cliente_request.rg
-    cliente.nome = cliente_request.nome
-    cliente.sexo = cliente_request.sexo
-    cliente.telefone = cliente_request.telefone
-    cliente.email = cliente_request.email
-    cliente.data_nascimento = cliente_request.data_nascimento
-    cliente.cpf = cliente_request.cpf
-    cliente.convenio_id = cliente_request.convenio_id
-    cliente.estado_civil_id = cliente_request.estado_civil_id
-    db.commit()
-    db.refresh(cliente)
-    return cliente
-
-
-@app.delete("/clientes/{cliente_id}")
-def delete_cliente(cliente_id: int, db=Depends(get_db)):
-    cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
-    db.delete(cliente)
-    db.commit()
-    return {"message": "Cliente deletado com sucesso"}
 
 
-@app.get("/enderecos_cliente/")
-def get_enderecos_cliente(db=Depends(get_db)):
-    enderecos_cliente = db.query(EnderecoCliente).all()
-    return enderecos_cliente
+# Trilha de auditoria, da alteração mais recente para a mais antiga (sort=data
+# para a ordem cronológica), com os filtros das listagens (ex.:
+# ?tabela=CP1_CLIENTE&registro_id=1 ou ?data__gte=2026-10-01T00:00:00)
+@app.get("/auditoria/", response_model=Pagina[AuditoriaResponse])
+def get_auditoria(listagem: ParametrosListagem, db=Depends(get_db)):
+    if listagem.sort is None:
+        listagem.sort = "-data,-id"
+    return paginar(db.query(Auditoria), Auditoria, listagem)
 
 
-@app.get("/enderecos_cliente/{endereco_cliente_id}")
-def get_endereco_cliente(endereco_cliente_id: int, db=Depends(get_db)):
-    endereco_cliente = (
-        db.query(EnderecoCliente)
-        .filter(EnderecoCliente.id == endereco_cliente_id)
-        .first()
+# Rotas de cada recurso. As de exportação e de lote são registradas antes das
+# rotas "/{id}" para não serem capturadas por elas
+for recurso in RECURSOS:
+    prefixo, modelo, schema = recurso.prefixo, recurso.modelo, recurso.schema
+    app.get(f"/{prefixo}/export", name=f"export_{prefixo}")(exportar(modelo))
+    app.post(f"/{prefixo}/bulk", name=f"bulk_create_{prefixo}")(
+        criar_lote(modelo, schema)
     )
-    return endereco_cliente
-
-
-@app.post("/enderecos_cliente/")
-def create_endereco_cliente(
-    endereco_cliente: EnderecoClienteRequest, db=Depends(get_db)
-):
-    novo_endereco_cliente = EnderecoCliente(
-        cliente_id=endereco_cliente.cliente_id,
-        rua=endereco_cliente.rua,
-        numero=endereco_cliente.numero,
-        cep=endereco_cliente.cep,
-        cidade_id=endereco_cliente.cidade_id,
+    app.put(f"/{prefixo}/bulk", name=f"bulk_update_{prefixo}")(
+        atualizar_lote(modelo, schema)
     )
-    db.add(novo_endereco_cliente)
-    db.commit()
-    db.refresh(novo_endereco_cliente)
-    return novo_endereco_cliente
-
-
-@app.put("/enderecos_cliente/{endereco_cliente_id}")
-def update_endereco_cliente(
-    endereco_cliente_id: int,
-    endereco_cliente_request: EnderecoClienteRequest,
+    app.delete(f"/{prefixo}/bulk", name=f"bulk_delete_{prefixo}")(deletar_lote(modelo))
+    registrar_crud(recurso)
+
+
+@app.get("/search", response_model=Pagina[ResultadoBusca])
+def get_search(
+    q: Annotated[
+        str, Query(min_length=1, description="Nome, CPF, RG, CRM ou especialidade")
+    ],
+    tipo: Optional[Literal["clientes", "medicos"]] = None,
+    limit: Limite = 20,
+    offset: Annotated[int, Query(ge=0)] = 0,
     db=Depends(get_db),
 ):
-    endereco_cliente = (
-        db.query(EnderecoCliente)
-        .filter(EnderecoCliente.id == endereco_cliente_id)
-        .first()
-    )
-    endereco_cliente.cliente_id = endereco_cliente_request.cliente_id
-    endereco_cliente.rua = endereco_cliente_request.rua
-    endereco_cliente.numero = endereco_cliente_request.numero
-    endereco_cliente.cep = endereco_cliente_request.cep
-    endereco_cliente.cidade_id = endereco_cliente_request.cidade_id
-    db.commit()
-    db.refresh(endereco_cliente)
-    return endereco_cliente
-
-
-@app.delete("/enderecos_cliente/{endereco_cliente_id}")
-def delete_endereco_cliente(endereco_cliente_id: int, db=Depends(get_db)):
-    endereco_cliente = (
-        db.query(EnderecoCliente)
-        .filter(EnderecoCliente.id == endereco_cliente_id)
-        .first()
-    )
-    db.delete(endereco_cliente)
-    db.commit()
-    return {"message": "Endereco do cliente deletado com sucesso"}
-
-
-@app.get("/comorbidades/")
-def get_comorbidades(db=Depends(get_db)):
-    comorbidades = db.query(Comorbidade).all()
-    return comorbidades
-
-
-@app.get("/comorbidades/{comorbidade_id}")
-def get_comorbidade(comorbidade_id: int, db=Depends(get_db)):
-    comorbidade = db.query(Comorbidade).filter(Comorbidade.id == comorbidade_id).first()
-    return comorbidade
-
-
-@app.post("/comorbidades/")
-def create_comorbidade(comorbidade: ComorbidadeRequest, db=Depends(get_db)):
-    nova_comorbidade = Comorbidade(nome=comorbidade.nome)
-    db.add(nova_comorbidade)
-    db.commit()
-    db.refresh(nova_comorbidade)
-    return nova_comorbidade
-
-
-@app.put("/comorbidades/{comorbidade_id}")
-def update_comorbidade(
-    comorbidade_id: int, comorbidade_request: ComorbidadeRequest, db=Depends(get_db)
-):
-    comorbidade = db.query(Comorbidade).filter(Comorbidade.id == comorbidade_id).first()
-    comorbidade.nome = comorbidade_request.nome
-    db.commit()
-    db.refresh(comorbidade)
-    return comorbidade
-
-
-@app.delete("/comorbidades/{comorbidade_id}")
-def delete_comorbidade(comorbidade_id: int, db=Depends(get_db)):
-    comorbidade = db.query(Comorbidade).filter(Comorbidade.id == comorbidade_id).first()
-    db.delete(comorbidade)
-    db.commit()
-    return {"message": "Comorbidade deletada com sucesso"}
-
-
-@app.get("/historicos_saude_cliente/")
-def get_historicos_saude_cliente(db=Depends(get_db)):
-    historicos_saude_cliente = db.query(HistoricoSaudeCliente).all()
-    return historicos_saude_cliente
-
-
-@app.get("/historicos_saude_cliente/{historico_saude_cliente_id}")
-def get_historico_saude_cliente(historico_saude_cliente_id: int, db=Depends(get_db)):
-    historico_saude_cliente = (
-        db.query(HistoricoSaudeCliente)
-        .filter(HistoricoSaudeCliente.id == historico_saude_cliente_id)
-        .first()
-    )
-    return historico_saude_cliente
-
-
-@app.post("/historicos_saude_cliente/")
-def create_historico_saude_cliente(
-    historico_saude_cliente: HistoricoSaudeClienteRequest, db=Depends(get_db)
+    # Cada recurso devolve os seus melhores resultados até o fim da página, com
+    # a relevância normalizada por buscar; a página sai da junção deles pela
+    # relevância. "next" é o offset seguinte
+    termos = re.findall(r"\w+", q)
+    resultados = []
+    for nome, (modelo, campo, colunas) in BUSCA.items():
+        if termos and tipo in (None, nome):
+            resultados += [
+                {"tipo": nome, "relevancia": relevancia, campo: registro}
+                for registro, relevancia in buscar(
+                    db, modelo, colunas, termos, offset + limit + 1
+                )
+            ]
+    resultados.sort(key=lambda resultado: -resultado["relevancia"])
+    proximo = offset + limit if len(resultados) > offset + limit else None
+    return {"items": resultados[offset : offset + limit], "next": proximo}
+
+
+@app.get("/cidades/estado/{estado_id}", response_model=Pagina[CidadeResponse])
+@em_cache(Cidade)
+def get_cidades_estado(
+    estado_id: int, listagem: ParametrosListagem, db=Depends(get_db)
 ):
-    novo_historico_saude_cliente = HistoricoSaudeCliente(
-        cliente_id=historico_saude_cliente.cliente_id,
-        comorbidade_id=historico_saude_cliente.comorbidade_id,
-        data_registro=historico_saude_cliente.data_registro,
-        fuma=historico_saude_cliente.fuma,
-        observacoes=historico_saude_cliente.observacoes,
+    cidades = paginar(
+        db.query(Cidade).filter(Cidade.estado_id == estado_id), Cidade, listagem
     )
-    db.add(novo_historico_saude_cliente)
-    db.commit()
-    db.refresh(novo_historico_saude_cliente)
-    return novo_historico_saude_cliente
+    return cidades
 
 
-@app.put("/historicos_saude_cliente/{historico_saude_cliente_id}")
-def update_historico_saude_cliente(
-    historico_saude_cliente_id: int,
-    historico_saude_cliente_request: HistoricoSaudeClienteRequest,
+@app.get("/cidades/{cidade_id}/unidades", response_model=Pagina[UnidadeResponse])
+@em_cache(Unidade, EnderecoUnidade, MedicoUnidade)
+def get_unidades_cidade(
+    cidade_id: int,
+    listagem: ParametrosListagem,
+    especialidade: Optional[str] = None,
     db=Depends(get_db),
 ):
-    historico_saude_cliente = (
-        db.query(HistoricoSaudeCliente)
-        .filter(HistoricoSaudeCliente.id == historico_saude_cliente_id)
-        .first()
+    # Unidades da cidade com o endereço vindo do próprio JOIN do filtro e,
+    # opcionalmente, só as que têm médico da especialidade. O expand do endereço
+    # continua a partir do contains_eager: um joinedload do mesmo
+    # relacionamento entraria em conflito com ele
+    listagem.remover_filtros("especialidade")
+    endereco = opcoes_expand(EnderecoUnidade, listagem.remover_expand("endereco"))
+    query = (
+        db.query(Unidade)
+        .join(Unidade.endereco)
+        .options(contains_eager(Unidade.endereco).options(*endereco))
+        .filter(EnderecoUnidade.cidade_id == cidade_id)
     )
-    historico_saude_cliente.cliente_id = historico_saude_cliente_request.cliente_id
-    historico_saude_cliente.comorbidade_id = historico_saude_cliente_request.comorbidade_id
-    historico_saude_cliente.data_registro = historico_saude_cliente_request.data_registro
-    historico_saude_cliente.fuma = historico_saude_cliente_request.fuma
-    historico_saude_cliente.observacoes = historico_saude_cliente_request.observacoes
-    db.commit()
-    db.refresh(historico_saude_cliente)
-    return historico_saude_cliente
+    if especialidade is not None:
+        query = query.filter(
+            exists().where(
+                MedicoUnidade.unidade_id == Unidade.id,
+                Medico.id == MedicoUnidade.medico_id,
+                Medico.especialidade == especialidade,
+            )
+        )
+    unidades = paginar(query, Unidade, listagem)
+    return unidades
 
 
-@app.delete("/historicos_saude_cliente/{historico_saude_cliente_id}")
-def delete_historico_saude_cliente(historico_saude_cliente_id: int, db=Depends(get_db)):
-    historico_saude_cliente = (
-        db.query(HistoricoSaudeCliente)
-        .filter(HistoricoSaudeCliente.id == historico_saude_cliente_id)
-        .first()
+@app.get(
+    "/unidades/{unidade_id}/medicos", response_model=Pagina[MedicoUnidadeResponse]
+)
+@em_cache(MedicoUnidade)
+def get_medicos_da_unidade(
+    unidade_id: int, listagem: ParametrosListagem, db=Depends(get_db)
+):
+    # Vínculos da unidade com os dados do médico no mesmo SELECT
+    medicos = paginar(
+        db.query(MedicoUnidade)
+        .options(joinedload(MedicoUnidade.medico))
+        .filter(MedicoUnidade.unidade_id == unidade_id),
+        MedicoUnidade,
+        listagem,
     )
-    db.delete(historico_saude_cliente)
-    db.commit()
-    return {"message": "Histórico de saúde do cliente deletado com sucesso"}
+    return medicos
 
 
-@app.get("/historicos_hospital_cliente/")
-def get_historicos_hospital_cliente(db=Depends(get_db)):
-    historicos_hospital_cliente = db.query(HistoricoHospitalCliente).all()
-    return historicos_hospital_cliente
+# Tudo o que a ficha do cliente exibe. As relações são todas "para um" (o
+# endereço e os históricos são únicos por cliente), então os joinedloads viram
+# um único SELECT com LEFT OUTER JOINs, sem multiplicar linhas
+RESUMO_CLIENTE = opcoes_expand(
+    Cliente,
+    "convenio,estado_civil,endereco.cidade.estado,historico_saude.comorbidade,"
+    "historico_hospital",
+)
 
 
-@app.get("/historicos_hospital_cliente/{historico_hospital_cliente_id}")
-def get_historico_hospital_cliente(
-    historico_hospital_cliente_id: int, db=Depends(get_db)
-):
-    historico_hospital_cliente = (
-        db.query(HistoricoHospitalCliente)
-        .filter(HistoricoHospitalCliente.id == historico_hospital_cliente_id)
+@app.get("/clientes/{cliente_id}/resumo", response_model=Optional[ClienteResponse])
+def get_resumo_cliente(cliente_id: int, db=Depends(get_db)):
+    cliente = (
+        db.query(Cliente)
+        .options(*RESUMO_CLIENTE)
+        .filter(Cliente.id == cliente_id)
         .first()
     )
-    return historico_hospital_cliente
+    return cliente
 
 
-@app.post("/historicos_hospital_cliente/")
-def create_historico_hospital_cliente(
-    historico_hospital_cliente: HistoricoHospitalClienteRequest, db=Depends(get_db)
+# Endereço e históricos do cliente, criados ou atualizados pelo mesmo PUT
+@app.put("/clientes/{cliente_id}/endereco", response_model=EnderecoClienteResponse)
+def upsert_endereco_cliente(
+    cliente_id: int, endereco_request: EnderecoClienteDados, db=Depends(get_db)
 ):
-    novo_historico_hospital_cliente = HistoricoHospitalCliente(
-        cliente_id=historico_hospital_cliente.cliente_id,
-        data_registro=historico_hospital_cliente.data_registro,
-        historico_medico=historico_hospital_cliente.historico_medico,
-        exames_realizados=historico_hospital_cliente.exames_realizados,
-        medicamentos_prescritos=historico_hospital_cliente.medicamentos_prescritos,
-        observacoes=historico_hospital_cliente.observacoes,
+    endereco = gravar_do_cliente(
+        db, EnderecoCliente, cliente_id, endereco_request.model_dump()
     )
-    db.add(novo_historico_hospital_cliente)
-    db.commit()
-    db.refresh(novo_historico_hospital_cliente)
-    return novo_historico_hospital_cliente
+    return endereco
 
 
-@app.put("/historicos_hospital_cliente/{historico_hospital_cliente_id}")
-def update_historico_hospital_cliente(
-    historico_hospital_cliente_id: int,
-    historico_hospital_cliente_request: HistoricoHospitalClienteRequest,
+@app.put(
+    "/clientes/{cliente_id}/historico_saude",
+    response_model=HistoricoSaudeClienteResponse,
+)
+def upsert_historico_saude_cliente(
+    cliente_id: int,
+    historico_saude_request: HistoricoSaudeClienteDados,
     db=Depends(get_db),
 ):
-    historico_hospital_cliente = (
-        db.query(HistoricoHospitalCliente)
-        .filter(HistoricoHospitalCliente.id == historico_hospital_cliente_id)
-        .first()
-    )
-    historico_hospital_cliente.cliente_id = historico_hospital_cliente_request.cliente_id
-    historico_hospital_cliente.data_registro = historico_hospital_cliente_request.data_registro
-    historico_hospital_cliente.historico_medico = (
-        historico_hospital_cliente_request.historico_medico
-    )
-    historico_hospital_cliente.exames_realizados = (
-        historico_hospital_cliente_request.exames_realizados
+    historico_saude = gravar_do_cliente(
+        db, HistoricoSaudeCliente, cliente_id, historico_saude_request.model_dump()
     )
-    historico_hospital_cliente.medicamentos_prescritos = (
-        historico_hospital_cliente_request.medicamentos_prescritos
-    )
-    historico_hospital_cliente.observacoes = historico_hospital_cliente_request.observacoes
-    db.commit()
-    db.refresh(historico_hospital_cliente)
-    return historico_hospital_cliente
+    return historico_saude
 
 
-@app.delete("/historicos_hospital_cliente/{historico_hospital_cliente_id}")
-def delete_historico_hospital_cliente(
-    historico_hospital_cliente_id: int, db=Depends(get_db)
+@app.put(
+    "/clientes/{cliente_id}/historico_hospital",
+    response_model=HistoricoHospitalClienteResponse,
+)
+def upsert_historico_hospital_cliente(
+    cliente_id: int,
+    historico_hospital_request: HistoricoHospitalClienteDados,
+    db=Depends(get_db),
 ):
-    historico_hospital_cliente = (
-        db.query(HistoricoHospitalCliente)
-        .filter(HistoricoHospitalCliente.id == historico_hospital_cliente_id)
-        .first()
+    historico_hospital = gravar_do_cliente(
+        db,
+        HistoricoHospitalCliente,
+        cliente_id,
+        historico_hospital_request.model_dump(),
     )
-    db.delete(historico_hospital_cliente)
-    db.commit()
-    return {"message": "Histórico hospitalar do cliente deletado com sucesso"}
+    return historico_hospital
 
 
 if __name__ == "__main__":
@@ -0,0 +1,174 @@
+# Instrumentação das requisições: latência por rota, quantidade de comandos SQL
+# e tempo gasto no banco, expostos no formato texto do Prometheus (/metrics) e
+# no cabeçalho Server-Timing de cada resposta.
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Match
+
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LIMITES_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+
+class Histograma:
+    def __init__(self, nome, descricao, limites):
+        self.nome = nome
+        self.descricao = descricao
+        self.limites = limites
+        self.lock = threading.Lock()
+        # rótulos -> [contagem por faixa, soma, total]
+        self.series = {}
+
+    def observar(self, rotulos, valor):
+        with self.lock:
+            serie = self.series.get(rotulos)
+            if serie is None:
+                serie = self.series[rotulos] = [[0] * len(self.limites), 0.0, 0]
+            faixa = bisect_left(self.limites, valor)
+            if faixa < len(self.limites):
+                serie[0][faixa] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exportar(self):
+        linhas = [
+            f"# HELP {self.nome} {self.descricao}",
+            f"# TYPE {self.nome} histogram",
+        ]
+        with self.lock:
+            series = sorted(self.series.items())
+            for rotulos, (contagens, soma, total) in series:
+                acumulado = 0
+                for limite, contagem in zip(self.limites, contagens):
+                    acumulado += contagem
+                    linhas.append(
+                        f"{self.nome}_bucket{{{formatar_rotulos(rotulos, limite)}}} "
+                        f"{acumulado}"
+                    )
+                infinito = formatar_rotulos(rotulos, "+Inf")
+                linhas.append(f"{self.nome}_bucket{{{infinito}}} {total}")
+                texto = formatar_rotulos(rotulos)
+                linhas.append(f"{self.nome}_sum{{{texto}}} {soma}")
+                linhas.append(f"{self.nome}_count{{{texto}}} {total}")
+        return "\n".join(linhas)
+
+
+def escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def formatar_rotulos(rotulos, limite=None):
+    pares = [f'{nome}="{escapar(valor)}"' for nome, valor in rotulos]
+    if limite is not None:
+        pares.append(f'le="{limite}"')
+    return ",".join(pares)
+
+
+latencia = Histograma(
+    "http_request_duration_seconds",
+    "Latência das requisições HTTP por rota.",
+    LIMITES_LATENCIA,
+)
+consultas = Histograma(
+    "http_request_sql_statements",
+    "Comandos SQL executados por requisição.",
+    LIMITES_CONSULTAS,
+)
+tempo_banco = Histograma(
+    "http_request_db_duration_seconds",
+    "Tempo gasto em comandos SQL por requisição.",
+    LIMITES_LATENCIA,
+)
+
+
+class Medicao:
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_banco = 0.0
+
+
+# Medição da requisição em andamento. O objeto é compartilhado com o threadpool
+# das rotas síncronas e com o run_sync do modo assíncrono, que copiam o contexto
+medicao_atual = contextvars.ContextVar("medicao_atual", default=None)
+
+
+# Comandos de controle de transação (o BEGIN explícito do SQLite, savepoints
+# das operações em lote) contam no tempo de banco, mas não como consultas
+CONTROLE_TRANSACAO = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+
+def instrumentar_engine(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def iniciar_consulta(conexao, cursor, sql, parametros, contexto, executemany):
+        contexto._inicio_consulta = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def finalizar_consulta(conexao, cursor, sql, parametros, contexto, executemany):
+        medicao = medicao_atual.get()
+        if medicao is not None:
+            if not sql.lstrip().upper().startswith(CONTROLE_TRANSACAO):
+                medicao.consultas += 1
+            medicao.tempo_banco += time.perf_counter() - contexto._inicio_consulta
+
+
+def nome_rota(scope):
+    # Usa o caminho declarado da rota (ex.: /clientes/{cliente_id}) para não
+    # criar uma série por id. Respostas devolvidas antes do roteamento (como os
+    # 304 do ETag) não têm a rota no scope, então ela é procurada aqui
+    rota = scope.get("route")
+    if rota is None:
+        for candidata in scope["app"].router.routes:
+            if candidata.matches(scope)[0] == Match.FULL:
+                rota = candidata
+                break
+    return rota.path if rota is not None else "nao_encontrada"
+
+
+class MetricasMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        medicao = Medicao()
+        token = medicao_atual.set(medicao)
+        inicio = time.perf_counter()
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+                duracao = (time.perf_counter() - inicio) * 1000
+                banco = medicao.tempo_banco * 1000
+                MutableHeaders(scope=mensagem).append(
+                    "Server-Timing",
+                    f"app;dur={duracao:.1f}, "
+                    f'db;dur={banco:.1f};desc="{medicao.consultas} SQL"',
+                )
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            medicao_atual.reset(token)
+            rotulos = (
+                ("method", scope["method"]),
+                ("route", nome_rota(scope)),
+                ("status", status),
+            )
+            latencia.observar(rotulos, time.perf_counter() - inicio)
+            consultas.observar(rotulos[:2], medicao.consultas)
+            tempo_banco.observar(rotulos[:2], medicao.tempo_banco)
+
+
+def exportar():
+    return "\n".join(
+        histograma.exportar() for histograma in (latencia, consultas, tempo_banco)
+    )
@@ -0,0 +1,65 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from main import Base, url_banco
+
+config = context.config
+
+# A conexão pode vir pronta de quem chama as migrações (como o modo SQLite da
+# API); nesse caso o logging da aplicação é mantido
+conexao_externa = config.attributes.get("connection")
+
+if config.config_file_name is not None and conexao_externa is None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def incluir_objeto(objeto, nome, tipo, refletido, comparado_com):
+    # Tabelas sem modelo na API (como a AUDITORIA_CP1_EMPRESA) ficam fora do
+    # autogenerate, que senão proporia removê-las
+    return not (tipo == "table" and refletido and comparado_com is None)
+
+
+def run_migrations_offline():
+    # Gera o SQL das migrações sem conectar ao banco (alembic upgrade --sql)
+    context.configure(
+        url=url_banco(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def migrar(conexao):
+    context.configure(
+        connection=conexao,
+        target_metadata=target_metadata,
+        compare_type=True,
+        include_object=incluir_objeto,
+        render_as_batch=conexao.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    if conexao_externa is not None:
+        migrar(conexao_externa)
+        return
+
+    engine = create_engine(url_banco(), poolclass=pool.NullPool)
+    with engine.connect() as conexao:
+        migrar(conexao)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,191 @@
+"""Esquema inicial, equivalente ao sql/script.sql original
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def chave(coluna, tabela, **opcoes):
+    return sa.Column(
+        coluna,
+        sa.Integer(),
+        sa.ForeignKey(f"{tabela}.id", ondelete="CASCADE"),
+        **opcoes,
+    )
+
+
+def upgrade():
+    op.create_table(
+        "CP1_ESTADO",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("nome", sa.String(20)),
+    )
+    op.create_table(
+        "CP1_CIDADE",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("nome", sa.String(20)),
+        chave("estado_id", "CP1_ESTADO"),
+    )
+    op.create_table(
+        "CP1_EMPRESA",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("cnpj", sa.String(20)),
+        sa.Column("nome", sa.String(100)),
+        sa.Column("tipo", sa.String(100)),
+        sa.Column("telefone", sa.String(20)),
+        sa.Column("email", sa.String(100)),
+    )
+    op.create_table(
+        "CP1_CONVENIO",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        chave("empresa_id", "CP1_EMPRESA"),
+        sa.Column("nome", sa.String(100)),
+        sa.Column("valor", sa.Float()),
+        sa.Column("tipo_servico", sa.String(100)),
+        sa.Column("cobertura", sa.String(100)),
+        sa.Column("contato", sa.String(100)),
+        sa.Column("validade", sa.Date()),
+    )
+    op.create_table(
+        "CP1_AREA_ATUACAO",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("nome", sa.String(100)),
+    )
+    op.create_table(
+        "CP1_UNIDADE",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        chave("empresa_id", "CP1_EMPRESA"),
+        chave("area_atuacao_id", "CP1_AREA_ATUACAO"),
+        sa.Column("nome", sa.String(100)),
+        sa.Column("telefone", sa.String(20)),
+        sa.Column("email", sa.String(100)),
+        sa.Column("tipo", sa.String(100)),
+        sa.Column("capacidade", sa.Integer()),
+    )
+    op.create_table(
+        "CP1_ENDERECO_UNIDADE",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        chave("unidade_id", "CP1_UNIDADE", nullable=False, unique=True),
+        sa.Column("rua", sa.String(100)),
+        sa.Column("numero", sa.String(10)),
+        sa.Column("cep", sa.String(20)),
+        chave("cidade_id", "CP1_CIDADE"),
+    )
+    op.create_table(
+        "CP1_MEDICO",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("nome", sa.String(100)),
+        sa.Column("telefone", sa.String(20)),
+        sa.Column("email", sa.String(100)),
+        sa.Column("especialidade", sa.String(100)),
+        sa.Column("crm", sa.String(20)),
+    )
+    op.create_table(
+        "CP1_MEDICO_UNIDADE",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        chave("medico_id", "CP1_MEDICO", nullable=False),
+        chave("unidade_id", "CP1_UNIDADE", nullable=False),
+        sa.Column("horario_atendimento", sa.String(100)),
+    )
+    op.create_table(
+        "CP1_ESTADO_CIVIL",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("nome", sa.String(20)),
+    )
+    op.create_table(
+        "CP1_CLIENTE",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("rg", sa.String(20)),
+        sa.Column("nome", sa.String(100)),
+        sa.Column("sexo", sa.CHAR(1)),
+        sa.Column("telefone", sa.String(20)),
+        sa.Column("email", sa.String(100)),
+        sa.Column("data_nascimento", sa.Date()),
+        sa.Column("cpf", sa.String(20)),
+        chave("convenio_id", "CP1_CONVENIO"),
+        chave("estado_civil_id", "CP1_ESTADO_CIVIL"),
+        sa.CheckConstraint("sexo IN ('M', 'F', 'O')"),
+    )
+    op.create_table(
+        "CP1_ENDERECO_CLIENTE",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        chave("cliente_id", "CP1_CLIENTE", nullable=False, unique=True),
+        sa.Column("rua", sa.String(100)),
+        sa.Column("numero", sa.String(10)),
+        sa.Column("cep", sa.String(20)),
+        chave("cidade_id", "CP1_CIDADE"),
+    )
+    op.create_table(
+        "CP1_COMORBIDADE",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("nome", sa.String(100)),
+    )
+    op.create_table(
+        "CP1_HISTORICO_SAUDE_CLIENTE",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        chave("cliente_id", "CP1_CLIENTE", nullable=False, unique=True),
+        chave("comorbidade_id", "CP1_COMORBIDADE"),
+        sa.Column("data_registro", sa.Date()),
+        sa.Column("fuma", sa.Integer()),
+        sa.Column("observacoes", sa.String(100)),
+        sa.CheckConstraint("fuma IN (0, 1)"),
+    )
+    op.create_table(
+        "CP1_HISTORICO_HOSPITAL_CLIENTE",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        chave("cliente_id", "CP1_CLIENTE", nullable=False, unique=True),
+        sa.Column("data_registro", sa.Date()),
+        sa.Column("historico_medico", sa.String(100)),
+        sa.Column("exames_realizados", sa.String(100)),
+        sa.Column("medicamentos_prescritos", sa.String(100)),
+        sa.Column("observacoes", sa.String(100)),
+    )
+    op.create_table(
+        "AUDITORIA_CP1_EMPRESA",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("operacao", sa.String(10)),
+        sa.Column("data_operacao", sa.Date()),
+        sa.Column("usuario", sa.String(50)),
+        sa.Column("cnpj_old", sa.String(20)),
+        sa.Column("nome_old", sa.String(100)),
+        sa.Column("tipo_old", sa.String(100)),
+        sa.Column("telefone_old", sa.String(20)),
+        sa.Column("email_old", sa.String(100)),
+        sa.Column("cnpj_new", sa.String(20)),
+        sa.Column("nome_new", sa.String(100)),
+        sa.Column("tipo_new", sa.String(100)),
+        sa.Column("telefone_new", sa.String(20)),
+        sa.Column("email_new", sa.String(100)),
+    )
+
+
+def downgrade():
+    for tabela in (
+        "AUDITORIA_CP1_EMPRESA",
+        "CP1_HISTORICO_HOSPITAL_CLIENTE",
+        "CP1_HISTORICO_SAUDE_CLIENTE",
+        "CP1_COMORBIDADE",
+        "CP1_ENDERECO_CLIENTE",
+        "CP1_CLIENTE",
+        "CP1_ESTADO_CIVIL",
+        "CP1_MEDICO_UNIDADE",
+        "CP1_MEDICO",
+        "CP1_ENDERECO_UNIDADE",
+        "CP1_UNIDADE",
+        "CP1_AREA_ATUACAO",
+        "CP1_CONVENIO",
+        "CP1_EMPRESA",
+        "CP1_CIDADE",
+        "CP1_ESTADO",
+    ):
+        op.drop_table(tabela)
@@ -0,0 +1,58 @@
+"""Índices das chaves estrangeiras e colunas de busca
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:01
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDICES = [
+    ("CP1_CIDADE", ["estado_id"]),
+    ("CP1_CONVENIO", ["empresa_id"]),
+    ("CP1_UNIDADE", ["empresa_id"]),
+    ("CP1_UNIDADE", ["area_atuacao_id"]),
+    ("CP1_ENDERECO_UNIDADE", ["cidade_id"]),
+    ("CP1_MEDICO", ["crm"]),
+    ("CP1_MEDICO_UNIDADE", ["unidade_id"]),
+    ("CP1_CLIENTE", ["cpf"]),
+    ("CP1_CLIENTE", ["convenio_id"]),
+    ("CP1_CLIENTE", ["estado_civil_id"]),
+    ("CP1_ENDERECO_CLIENTE", ["cidade_id"]),
+    ("CP1_HISTORICO_SAUDE_CLIENTE", ["comorbidade_id"]),
+]
+
+
+def upgrade():
+    for tabela, colunas in INDICES:
+        op.create_index(f"ix_{tabela}_{'_'.join(colunas)}", tabela, colunas)
+    op.create_index(
+        "ix_CP1_MEDICO_UNIDADE_medico_unidade",
+        "CP1_MEDICO_UNIDADE",
+        ["medico_id", "unidade_id"],
+    )
+    # No SQL Server um índice UNIQUE aceita um único NULL; o filtro mantém
+    # permitidas as empresas cadastradas sem CNPJ
+    op.create_index(
+        "ix_CP1_EMPRESA_cnpj",
+        "CP1_EMPRESA",
+        ["cnpj"],
+        unique=True,
+        mssql_where=sa.text("cnpj IS NOT NULL"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_CP1_EMPRESA_cnpj", table_name="CP1_EMPRESA")
+    op.drop_index(
+        "ix_CP1_MEDICO_UNIDADE_medico_unidade", table_name="CP1_MEDICO_UNIDADE"
+    )
+    for tabela, colunas in reversed(INDICES):
+        op.drop_index(f"ix_{tabela}_{'_'.join(colunas)}", table_name=tabela)
@@ -0,0 +1,23 @@
+"""Índice da especialidade dos médicos
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:02
+
+"""
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filtro por especialidade das unidades de uma cidade
+    op.create_index("ix_CP1_MEDICO_especialidade", "CP1_MEDICO", ["especialidade"])
+
+
+def downgrade():
+    op.drop_index("ix_CP1_MEDICO_especialidade", table_name="CP1_MEDICO")
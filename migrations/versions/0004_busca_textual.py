@@ -0,0 +1,99 @@
+"""Índices de busca textual de clientes e médicos
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:03
+
+"""
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# Colunas pesquisadas pela rota /search (as mesmas de BUSCA em main.py)
+BUSCA = {
+    "CP1_CLIENTE": ["nome", "cpf", "rg"],
+    "CP1_MEDICO": ["nome", "crm", "especialidade"],
+}
+CATALOGO = "catalogo_busca"
+
+
+def upgrade():
+    dialeto = op.get_context().dialect.name
+    if dialeto == "sqlite":
+        for tabela, colunas in BUSCA.items():
+            criar_fts5(tabela, colunas)
+    elif dialeto == "mssql":
+        # O DDL de full-text não pode rodar dentro de uma transação. Sem
+        # ACCENT_SENSITIVITY o catálogo segue a collation do banco, sensível a
+        # acentos no Azure SQL, e "jose" não encontraria "José" (no SQLite, o
+        # remove_diacritics do FTS5 já ignora os acentos)
+        with op.get_context().autocommit_block():
+            op.execute(
+                f"CREATE FULLTEXT CATALOG {CATALOGO} WITH ACCENT_SENSITIVITY = OFF"
+            )
+            for tabela, colunas in BUSCA.items():
+                criar_indice_fulltext(tabela, colunas)
+
+
+def downgrade():
+    dialeto = op.get_context().dialect.name
+    if dialeto == "sqlite":
+        for tabela in BUSCA:
+            for sufixo in ("ai", "ad", "au"):
+                op.execute(f"DROP TRIGGER {tabela}_BUSCA_{sufixo}")
+            op.execute(f"DROP TABLE {tabela}_BUSCA")
+    elif dialeto == "mssql":
+        with op.get_context().autocommit_block():
+            for tabela in BUSCA:
+                op.execute(f"DROP FULLTEXT INDEX ON {tabela}")
+            op.execute(f"DROP FULLTEXT CATALOG {CATALOGO}")
+
+
+def criar_fts5(tabela, colunas):
+    # Tabela FTS5 de conteúdo externo (o texto fica só na tabela original),
+    # mantida pelos gatilhos em qualquer escrita, inclusive as do ON DELETE
+    # CASCADE. Atenção: migrações em modo batch dessas tabelas recriam a tabela
+    # e descartam os gatilhos, que precisam ser criados de novo
+    indice = f"{tabela}_BUSCA"
+    lista = ", ".join(colunas)
+    novos = ", ".join(f"new.{coluna}" for coluna in colunas)
+    antigos = ", ".join(f"old.{coluna}" for coluna in colunas)
+    op.execute(
+        f"CREATE VIRTUAL TABLE {indice} USING fts5({lista}, content='{tabela}', "
+        "content_rowid='id', tokenize='unicode61 remove_diacritics 2', "
+        "prefix='2 3')"
+    )
+    op.execute(
+        f"CREATE TRIGGER {indice}_ai AFTER INSERT ON {tabela} BEGIN "
+        f"INSERT INTO {indice} (rowid, {lista}) VALUES (new.id, {novos}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {indice}_ad AFTER DELETE ON {tabela} BEGIN "
+        f"INSERT INTO {indice} ({indice}, rowid, {lista}) "
+        f"VALUES ('delete', old.id, {antigos}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {indice}_au AFTER UPDATE ON {tabela} BEGIN "
+        f"INSERT INTO {indice} ({indice}, rowid, {lista}) "
+        f"VALUES ('delete', old.id, {antigos}); "
+        f"INSERT INTO {indice} (rowid, {lista}) VALUES (new.id, {novos}); END"
+    )
+    # Indexa as linhas já existentes
+    op.execute(f"INSERT INTO {indice} ({indice}) VALUES ('rebuild')")
+
+
+def criar_indice_fulltext(tabela, colunas):
+    # O índice full-text exige o nome do índice da chave primária, gerado pelo
+    # SQL Server na criação da tabela; o rastreamento automático mantém o
+    # índice atualizado a cada escrita
+    op.execute(
+        "DECLARE @chave sysname = (SELECT name FROM sys.indexes "
+        f"WHERE object_id = OBJECT_ID('{tabela}') AND is_primary_key = 1); "
+        f"EXEC('CREATE FULLTEXT INDEX ON {tabela} ({', '.join(colunas)}) "
+        f"KEY INDEX ' + QUOTENAME(@chave) + ' ON {CATALOGO} "
+        "WITH CHANGE_TRACKING AUTO')"
+    )
@@ -0,0 +1,39 @@
+"""Tabela da trilha de auditoria
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:04
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Gravada pela aplicação (main.Auditoria), em lotes, a partir das escritas
+    # confirmadas em todas as tabelas
+    op.create_table(
+        "AUDITORIA_CP1",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("data", sa.DateTime(), nullable=False),
+        sa.Column("tabela", sa.String(50), nullable=False),
+        sa.Column("registro_id", sa.Integer(), nullable=False),
+        sa.Column("operacao", sa.String(10), nullable=False),
+        sa.Column("alteracoes", sa.UnicodeText(), nullable=False),
+    )
+    op.create_index("ix_AUDITORIA_CP1_data", "AUDITORIA_CP1", ["data"])
+    op.create_index(
+        "ix_AUDITORIA_CP1_tabela_registro",
+        "AUDITORIA_CP1",
+        ["tabela", "registro_id", "data"],
+    )
+
+
+def downgrade():
+    op.drop_table("AUDITORIA_CP1")
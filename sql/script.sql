@@ -1,3 +1,5 @@
+-- Esquema equivalente à última revisão das migrações (migrations/versions):
+-- um banco criado por este script deve ser marcado com `alembic stamp head`
 -- Dropping tables (without CASCADE CONSTRAINTS)
 DROP TABLE IF EXISTS CP1_EMPRESA;
 
@@ -31,6 +33,17 @@ DROP TABLE IF EXISTS CP1_ESTADO_CIVIL;
 
 DROP TABLE IF EXISTS AUDITORIA_CP1_EMPRESA;
 
+DROP TABLE IF EXISTS AUDITORIA_CP1;
+
+IF EXISTS (
+    SELECT
+        1
+    FROM
+        sys.fulltext_catalogs
+    WHERE
+        name = 'catalogo_busca'
+) DROP FULLTEXT CATALOG catalogo_busca;
+
 -- Sequences are replaced by IDENTITY in MSSQL
 CREATE TABLE
     CP1_ESTADO (
@@ -185,6 +198,81 @@ CREATE TABLE
         FOREIGN KEY (CLIENTE_ID) REFERENCES CP1_CLIENTE (ID) ON DELETE CASCADE
     );
 
+-- Índices das chaves estrangeiras e colunas de busca (os mesmos nomes
+-- declarados nos modelos da API). A chave primária e as colunas UNIQUE já são
+-- indexadas pelas próprias restrições
+CREATE INDEX ix_CP1_CIDADE_estado_id ON CP1_CIDADE (ESTADO_ID);
+
+CREATE UNIQUE INDEX ix_CP1_EMPRESA_cnpj ON CP1_EMPRESA (CNPJ)
+WHERE
+    CNPJ IS NOT NULL;
+
+CREATE INDEX ix_CP1_CONVENIO_empresa_id ON CP1_CONVENIO (EMPRESA_ID);
+
+CREATE INDEX ix_CP1_UNIDADE_empresa_id ON CP1_UNIDADE (EMPRESA_ID);
+
+CREATE INDEX ix_CP1_UNIDADE_area_atuacao_id ON CP1_UNIDADE (AREA_ATUACAO_ID);
+
+CREATE INDEX ix_CP1_ENDERECO_UNIDADE_cidade_id ON CP1_ENDERECO_UNIDADE (CIDADE_ID);
+
+CREATE INDEX ix_CP1_MEDICO_crm ON CP1_MEDICO (CRM);
+
+CREATE INDEX ix_CP1_MEDICO_especialidade ON CP1_MEDICO (ESPECIALIDADE);
+
+CREATE INDEX ix_CP1_MEDICO_UNIDADE_medico_unidade ON CP1_MEDICO_UNIDADE (MEDICO_ID, UNIDADE_ID);
+
+CREATE INDEX ix_CP1_MEDICO_UNIDADE_unidade_id ON CP1_MEDICO_UNIDADE (UNIDADE_ID);
+
+CREATE INDEX ix_CP1_CLIENTE_cpf ON CP1_CLIENTE (CPF);
+
+CREATE INDEX ix_CP1_CLIENTE_convenio_id ON CP1_CLIENTE (CONVENIO_ID);
+
+CREATE INDEX ix_CP1_CLIENTE_estado_civil_id ON CP1_CLIENTE (ESTADO_CIVIL_ID);
+
+CREATE INDEX ix_CP1_ENDERECO_CLIENTE_cidade_id ON CP1_ENDERECO_CLIENTE (CIDADE_ID);
+
+CREATE INDEX ix_CP1_HISTORICO_SAUDE_CLIENTE_comorbidade_id ON CP1_HISTORICO_SAUDE_CLIENTE (COMORBIDADE_ID);
+
+-- Busca textual da rota /search (migração 0004): catálogo sem diferenciar
+-- acentos e índices full-text mantidos pelo próprio banco a cada escrita. O
+-- índice full-text exige o nome do índice da chave primária, gerado pelo SQL
+-- Server. Este DDL não pode rodar dentro de uma transação
+CREATE FULLTEXT CATALOG catalogo_busca
+WITH
+    ACCENT_SENSITIVITY = OFF;
+
+DECLARE @chave sysname;
+
+SET
+    @chave = (
+        SELECT
+            name
+        FROM
+            sys.indexes
+        WHERE
+            object_id = OBJECT_ID ('CP1_CLIENTE')
+            AND is_primary_key = 1
+    );
+
+EXEC (
+    'CREATE FULLTEXT INDEX ON CP1_CLIENTE (NOME, CPF, RG) KEY INDEX ' + QUOTENAME (@chave) + ' ON catalogo_busca WITH CHANGE_TRACKING AUTO'
+);
+
+SET
+    @chave = (
+        SELECT
+            name
+        FROM
+            sys.indexes
+        WHERE
+            object_id = OBJECT_ID ('CP1_MEDICO')
+            AND is_primary_key = 1
+    );
+
+EXEC (
+    'CREATE FULLTEXT INDEX ON CP1_MEDICO (NOME, CRM, ESPECIALIDADE) KEY INDEX ' + QUOTENAME (@chave) + ' ON catalogo_busca WITH CHANGE_TRACKING AUTO'
+);
+
 CREATE TABLE
     AUDITORIA_CP1_EMPRESA (
         ID INT IDENTITY (1, 1) PRIMARY KEY,
@@ -201,4 +289,19 @@ CREATE TABLE
         TIPO_NEW VARCHAR(100),
         TELEFONE_NEW VARCHAR(20),
         EMAIL_NEW VARCHAR(100)
-    );
\ No newline at end of file
+    );
+
+-- Trilha de auditoria gravada pela aplicação (main.Auditoria)
+CREATE TABLE
+    AUDITORIA_CP1 (
+        ID INT IDENTITY (1, 1) PRIMARY KEY,
+        DATA DATETIME NOT NULL,
+        TABELA VARCHAR(50) NOT NULL,
+        REGISTRO_ID INT NOT NULL,
+        OPERACAO VARCHAR(10) NOT NULL,
+        ALTERACOES NVARCHAR(MAX) NOT NULL
+    );
+
+CREATE INDEX ix_AUDITORIA_CP1_data ON AUDITORIA_CP1 (DATA);
+
+CREATE INDEX ix_AUDITORIA_CP1_tabela_registro ON AUDITORIA_CP1 (TABELA, REGISTRO_ID, DATA);
\ No newline at end of file
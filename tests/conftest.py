@@ -0,0 +1,38 @@
+# Testes da API sobre o SQLite em memória (banco_local): cada teste recebe um
+# banco novo, com o esquema das migrações e os dados de exemplo do
+# sql/inserts.sql, recriado quando o lifespan da aplicação sobe de novo
+import os
+import time
+
+os.environ["DATABASE_URL"] = "sqlite://"
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from cache import criar_cache
+
+
+@pytest.fixture
+def api(monkeypatch):
+    # As versões das tabelas recomeçam junto com o banco: o cache também
+    monkeypatch.setattr(
+        main, "cache", criar_cache("memoria", maximo=1024, ttl=main.CACHE_TTL)
+    )
+    with TestClient(main.app) as cliente:
+        yield cliente
+
+
+@pytest.fixture
+def esperar_auditoria():
+    # A auditoria é gravada em segundo plano: espera mais "quantidade"
+    # registros gravados desde o início do teste
+    inicio = main.auditoria.gravados
+
+    def esperar(quantidade, limite=5):
+        fim = time.monotonic() + limite
+        while main.auditoria.gravados < inicio + quantidade:
+            assert time.monotonic() < fim, "registros de auditoria não gravados"
+            time.sleep(0.01)
+
+    return esperar
@@ -0,0 +1,114 @@
+import json
+
+import main
+
+
+def registros(api, **filtros):
+    resposta = api.get("/auditoria/", params={"sort": "id", **filtros})
+    assert resposta.status_code == 200
+    return resposta.json()["items"]
+
+
+def test_exclusao_audita_as_linhas_removidas_em_cascata(api, esperar_auditoria):
+    historico = api.get("/historicos_saude_cliente/", params={"cliente_id": 1})
+    historico = historico.json()["items"][0]
+
+    assert api.delete("/clientes/1").status_code == 200
+    esperar_auditoria(4)
+
+    exclusoes = {
+        (registro["tabela"], registro["registro_id"]): registro["alteracoes"]
+        for registro in registros(api, operacao="DELETE")
+    }
+    assert exclusoes["CP1_CLIENTE", 1]["nome"] == "João da Silva"
+    assert exclusoes["CP1_HISTORICO_SAUDE_CLIENTE", historico["id"]] == {
+        campo: valor for campo, valor in historico.items() if campo != "id"
+    }
+    tabelas = {tabela for tabela, _ in exclusoes}
+    assert {"CP1_ENDERECO_CLIENTE", "CP1_HISTORICO_HOSPITAL_CLIENTE"} <= tabelas
+
+
+def test_exclusao_em_lote_audita_a_cascata(api, esperar_auditoria):
+    resposta = api.request("DELETE", "/clientes/bulk", json=[1, 2])
+    assert resposta.json()["sucessos"] == 2
+    esperar_auditoria(2)
+
+    historicos = registros(api, tabela="CP1_HISTORICO_SAUDE_CLIENTE")
+    assert {registro["alteracoes"]["cliente_id"] for registro in historicos} == {1, 2}
+
+
+def test_atualizacao_registra_so_os_campos_alterados(api, esperar_auditoria):
+    api.patch("/clientes/1", json={"telefone": "11999999999"})
+    api.patch("/clientes/1", json={"telefone": "11999999999"})
+    esperar_auditoria(1)
+
+    (registro,) = registros(api, tabela="CP1_CLIENTE", registro_id=1)
+    assert registro["operacao"] == "UPDATE"
+    assert registro["alteracoes"] == {"telefone": ["11223344", "11999999999"]}
+
+
+def test_savepoint_desfeito_nao_gera_registro(api, esperar_auditoria):
+    itens = [{"nome": "ok", "estado_id": 1}, {"nome": "ruim", "estado_id": 9999}]
+    resposta = api.post("/cidades/bulk", json=itens)
+    assert resposta.json()["falhas"] == 1
+    esperar_auditoria(1)
+
+    cidades = registros(api, tabela="CP1_CIDADE")
+    assert [registro["alteracoes"]["nome"] for registro in cidades] == ["ok"]
+
+
+def test_lote_rejeitado_e_gravado_de_novo(api, esperar_auditoria, monkeypatch):
+    gravar_lote = main.GravadorAuditoria.gravar_lote
+    chamadas = []
+
+    def falhar_uma_vez(self, db, itens):
+        chamadas.append(len(itens))
+        if len(chamadas) == 1:
+            raise main.SQLAlchemyError("indisponível")
+        return gravar_lote(self, db, itens)
+
+    monkeypatch.setattr(main.GravadorAuditoria, "gravar_lote", falhar_uma_vez)
+    monkeypatch.setattr(main.GravadorAuditoria, "intervalo", lambda self, _: 0)
+    falhas = main.auditoria.falhas
+    api.patch("/clientes/1", json={"telefone": "11999999999"})
+    esperar_auditoria(1)
+
+    assert chamadas == [1, 1]
+    assert main.auditoria.falhas == falhas
+    assert len(registros(api, tabela="CP1_CLIENTE", registro_id=1)) == 1
+
+
+def linhas_do_banco(api):
+    # (tabela, id) de todas as linhas das tabelas dos recursos, pela exportação
+    linhas = set()
+    for recurso in main.RECURSOS:
+        resposta = api.get(f"/{recurso.prefixo}/export")
+        tabela = recurso.modelo.__tablename__
+        linhas |= {
+            (tabela, json.loads(linha)["id"]) for linha in resposta.text.splitlines()
+        }
+    return linhas
+
+
+def test_cascata_grande_e_lida_e_gravada_em_partes(
+    api, esperar_auditoria, monkeypatch
+):
+    # Leituras de uma linha e nenhum registro pendente na sessão: toda a
+    # cascata é gravada na transação do DELETE, parte a parte
+    monkeypatch.setattr(main, "LOTE_IDS", 1)
+    monkeypatch.setattr(main, "AUDITORIA_LOTE", 0)
+    antes = linhas_do_banco(api)
+    gravados = main.auditoria.gravados
+
+    assert api.delete("/estados/1").status_code == 200
+    esperar_auditoria(1)
+    # Só o registro do estado passou pela fila
+    assert main.auditoria.gravados == gravados + 1
+
+    removidas = antes - linhas_do_banco(api)
+    exclusoes = {
+        (registro["tabela"], registro["registro_id"])
+        for registro in registros(api, operacao="DELETE", limit=1000)
+    }
+    assert len(removidas) > 3
+    assert exclusoes == removidas
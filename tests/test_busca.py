@@ -0,0 +1,28 @@
+def buscar(api, **parametros):
+    resposta = api.get("/search", params={"limit": 50, **parametros})
+    assert resposta.status_code == 200
+    return resposta.json()["items"]
+
+
+def test_relevancia_e_relativa_ao_melhor_resultado_de_cada_tipo(api):
+    itens = buscar(api, q="c")
+    relevancias = [item["relevancia"] for item in itens]
+
+    assert {item["tipo"] for item in itens} == {"clientes", "medicos"}
+    assert relevancias == sorted(relevancias, reverse=True)
+    for tipo in ("clientes", "medicos"):
+        melhor = max(item["relevancia"] for item in itens if item["tipo"] == tipo)
+        assert melhor == 1
+
+
+def test_relevancia_nao_depende_dos_outros_tipos(api):
+    clientes = buscar(api, q="silva", tipo="clientes")
+    todos = buscar(api, q="silva")
+
+    assert [item for item in todos if item["tipo"] == "clientes"] == clientes
+
+
+def test_busca_ignora_acentos(api):
+    itens = buscar(api, q="jose", tipo="medicos")
+
+    assert [item["medico"]["nome"] for item in itens] == ["Dr. José Santos"]
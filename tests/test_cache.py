@@ -0,0 +1,29 @@
+import main
+
+
+def test_savepoint_so_invalida_no_commit_da_transacao(api, monkeypatch):
+    incrementadas = []
+    incrementar_versao = main.cache.incrementar_versao
+
+    def registrar(tabela):
+        incrementadas.append(tabela)
+        return incrementar_versao(tabela)
+
+    def gravar(db):
+        with db.begin_nested():
+            db.add(main.Estado(nome="Acre"))
+        assert incrementadas == []
+        db.commit()
+
+    async def gravar_async():
+        async with main.banco.sessao_async() as db:
+            await db.run_sync(gravar)
+
+    monkeypatch.setattr(main.cache, "incrementar_versao", registrar)
+    if main.DB_ASYNC:
+        api.portal.call(gravar_async)
+    else:
+        with main.banco.sessao() as db:
+            gravar(db)
+
+    assert "CP1_ESTADO" in incrementadas
@@ -0,0 +1,65 @@
+import pytest
+
+
+def revalidar(api, caminho, etag):
+    return api.get(caminho, headers={"If-None-Match": etag})
+
+
+@pytest.mark.parametrize(
+    "caminho", ["/clientes/1?expand=endereco", "/clientes/?expand=endereco&limit=1"]
+)
+def test_etag_muda_com_o_relacionamento_reverso_do_expand(api, caminho):
+    resposta = api.get(caminho)
+    etag = resposta.headers["ETag"]
+    assert revalidar(api, caminho, etag).status_code == 304
+
+    endereco = {"rua": "Rua Nova", "numero": "10", "cep": "00000-000", "cidade_id": 1}
+    assert api.put("/clientes/1/endereco", json=endereco).status_code == 200
+
+    resposta = revalidar(api, caminho, etag)
+    assert resposta.status_code == 200
+    assert "Rua Nova" in resposta.text
+
+
+def test_etag_sem_expand_ignora_tabelas_nao_lidas(api):
+    resposta = api.get("/clientes/1")
+    etag = resposta.headers["ETag"]
+    endereco = {"rua": "Rua Nova", "numero": "10", "cep": "00000-000", "cidade_id": 1}
+    api.put("/clientes/1/endereco", json=endereco)
+    assert revalidar(api, "/clientes/1", etag).status_code == 304
+
+
+def test_etag_da_unidade_muda_com_o_endereco_expandido(api):
+    caminho = "/unidades/1?expand=endereco"
+    etag = api.get(caminho).headers["ETag"]
+
+    resposta = api.patch("/enderecos_unidade/1", json={"rua": "Rua Nova"})
+    assert resposta.status_code == 200
+
+    resposta = revalidar(api, caminho, etag)
+    assert resposta.status_code == 200
+    assert resposta.json()["endereco"]["rua"] == "Rua Nova"
+
+
+def test_cache_dos_medicos_da_unidade_inclui_o_expand(api):
+    caminho = "/unidades/1/medicos?expand=unidade.endereco"
+    anterior = api.get(caminho).json()["items"]
+    assert anterior
+
+    api.patch("/enderecos_unidade/1", json={"rua": "Rua Nova"})
+
+    itens = api.get(caminho).json()["items"]
+    assert itens[0]["unidade"]["endereco"]["rua"] == "Rua Nova"
+
+
+@pytest.mark.parametrize(
+    "caminho, status", [("/estados/1", 304), ("/estados/9999", 200)]
+)
+def test_if_none_match_qualquer_so_corresponde_se_o_recurso_existe(
+    api, caminho, status
+):
+    resposta = revalidar(api, caminho, "*")
+
+    assert resposta.status_code == status
+    if status == 200:
+        assert resposta.json() is None
@@ -0,0 +1,41 @@
+import concurrent.futures
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def grupo(api):
+    grupo = main.GrupoCommit(main.HistoricoSaudeCliente)
+    grupo.iniciar()
+    yield grupo
+    api.portal.call(grupo.encerrar)
+
+
+@pytest.fixture
+def historico(api):
+    # Um histórico por cliente: o existente sai para ser gravado de novo
+    historico = api.get("/historicos_saude_cliente/").json()["items"][0]
+    api.delete(f"/historicos_saude_cliente/{historico['id']}")
+    return main.HistoricoSaudeClienteRequest(**historico).model_dump()
+
+
+@pytest.mark.skipif(main.DB_ASYNC, reason="o trabalhador assíncrono roda no loop")
+def test_item_cancelado_fica_fora_do_lote(grupo, historico):
+    cancelado = concurrent.futures.Future()
+    cancelado.cancel()
+    grupo.colocar((historico, cancelado))
+
+    assert grupo.gravar(historico)["cliente_id"] == historico["cliente_id"]
+    assert grupo.trabalhador.is_alive()
+
+
+@pytest.mark.skipif(main.DB_ASYNC, reason="o trabalhador assíncrono roda no loop")
+def test_sem_resposta_a_requisicao_recebe_503(grupo, historico, monkeypatch):
+    monkeypatch.setattr(main, "GRUPO_TIMEOUT", 0.05)
+    monkeypatch.setattr(main.GrupoCommit, "concluir", lambda *_: None)
+
+    with pytest.raises(main.HTTPException) as erro:
+        grupo.gravar(historico)
+    assert erro.value.status_code == 503
@@ -0,0 +1,74 @@
+import pytest
+
+
+@pytest.mark.parametrize(
+    "caminho, parametros, detalhe",
+    [
+        ("/medicos/", {"id__startswith": "1"}, "Operador startswith só se aplica"),
+        (
+            "/convenios/",
+            {"validade__startswith": "2025"},
+            "Operador startswith só se aplica",
+        ),
+        ("/medicos/", {"fields": ","}, "Nenhum campo em fields"),
+        ("/medicos/", {"fields": "nome,senha"}, "Campo inválido: senha"),
+        ("/medicos/", {"senha": "1"}, "Campo inválido: senha"),
+        ("/medicos/", {"nome__like": "Ana"}, "Operador de filtro inválido"),
+        ("/medicos/", {"id__in": "1,a"}, "Valor inválido para id__in"),
+        ("/medicos/", {"sort": "-senha"}, "Campo inválido: senha"),
+    ],
+)
+def test_erros_de_filtro_e_campos_respondem_400(api, caminho, parametros, detalhe):
+    resposta = api.get(caminho, params=parametros)
+
+    assert resposta.status_code == 400
+    assert resposta.json()["detail"].startswith(detalhe)
+
+
+def test_startswith_em_texto_escapa_curingas(api):
+    itens = api.get("/medicos/", params={"nome__startswith": "Dra"}).json()["items"]
+    assert itens and all(item["nome"].startswith("Dra") for item in itens)
+
+    resposta = api.get("/medicos/", params={"nome__startswith": "%"})
+    assert resposta.json()["items"] == []
+
+
+def test_fields_traz_so_os_campos_pedidos(api):
+    resposta = api.get("/medicos/", params={"fields": " nome, ", "limit": 1})
+
+    assert resposta.json()["items"] == [{"id": 1, "nome": "Dr. José Santos"}]
+
+
+@pytest.mark.parametrize("expand", ["endereco", "endereco.cidade"])
+def test_unidades_da_cidade_aceitam_expand_do_endereco(api, expand):
+    resposta = api.get("/cidades/1/unidades/", params={"expand": expand})
+
+    assert resposta.status_code == 200
+    (unidade,) = resposta.json()["items"]
+    assert unidade["endereco"]["cidade_id"] == 1
+    if expand == "endereco.cidade":
+        assert unidade["endereco"]["cidade"]["nome"] == "São Paulo"
+
+
+def ids(api, caminho, **parametros):
+    resposta = api.get(caminho, params=parametros).json()
+    return [item["id"] for item in resposta["items"]], resposta["next"]
+
+
+def test_sort_por_id_decrescente_pagina_com_after_id(api):
+    todos, _ = ids(api, "/medicos/", sort="-id")
+    assert todos == sorted(todos, reverse=True)
+
+    pagina, proximo = ids(api, "/medicos/", sort="-id", limit=2)
+    seguinte, _ = ids(api, "/medicos/", sort="-id", limit=2, after_id=proximo)
+    assert pagina + seguinte == todos[:4]
+
+
+def test_id_decrescente_desempata_outra_ordenacao(api):
+    todos, _ = ids(api, "/medicos/", sort="especialidade,-id")
+    pagina, proximo = ids(api, "/medicos/", sort="especialidade,-id", limit=1)
+    seguinte, _ = ids(
+        api, "/medicos/", sort="especialidade,-id", limit=2, after_id=proximo
+    )
+
+    assert pagina + seguinte == todos[:3]
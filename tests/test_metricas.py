@@ -0,0 +1,34 @@
+import time
+
+import main
+
+
+def test_pool_informa_os_limites_do_pool_em_uso(api):
+    pool = api.get("/metrics/pool").json()
+
+    # O SQLite usa um pool próprio de uma conexão, sem overflow
+    assert pool["size"] == main.banco.pool.size() == 1
+    assert pool["max_overflow"] == 0
+    assert main.OPCOES_POOL["max_overflow"] != 0
+
+
+def test_health_nao_expoe_o_erro_do_aquecimento(api, monkeypatch, caplog):
+    def recusar():
+        raise main.SQLAlchemyError("senha inválida para o usuário sa")
+
+    # Espera o aquecimento da inicialização, que roda em segundo plano
+    banco = main.banco
+    while banco.estado in ("frio", "aquecendo"):
+        time.sleep(0.01)
+    engine = banco.engine_async.sync_engine if main.DB_ASYNC else banco.engine
+    monkeypatch.setattr(engine, "connect", recusar)
+    api.portal.call(banco.aquecer, 1)
+
+    assert api.get("/health").json()["database"] == "erro"
+    assert "senha inválida" in caplog.text
+
+
+def test_begin_do_sqlite_nao_conta_como_consulta(api):
+    resposta = api.get("/medicos/1")
+
+    assert resposta.headers["Server-Timing"].endswith('desc="1 SQL"')